@@ -2,6 +2,7 @@
 # ======================================================================
 # MAIN ENTRY POINT FOR THE PROJECT
 # Displays a CLI menu to choose which scraper to run (Isaco, IKCO, Saipa), or run all with 'a'.
+# 'm' matches parts across sites (from the latest CSVs) without scraping.
 # Usage: python cli_menu.py (menu) or python cli_menu.py a (run all) or python cli_menu.py 3 (Saipa).
 # ======================================================================
 
@@ -10,27 +11,11 @@ import importlib
 import sys
 
 # ----------------------------------------------------------------------
-# LIST OF SCRAPERS — ADD NEW ONES HERE
+# LIST OF SCRAPERS — lives in orchestrator.py (ADD NEW ONES THERE)
 # ----------------------------------------------------------------------
-# Each scraper must have an async def scrape() function.
-# Add new scrapers by copying the dict format.
-SCRAPERS = [
-    {
-        "name": "Isaco",
-        "module": "scrapers.isaco_scraper",
-        "description": "Scrapes Isaco.ir for vehicle parts and prices (7200+ rows)"
-    },
-    {
-        "name": "IKCO Part",
-        "module": "scrapers.ikcopart_scraper",
-        "description": "Scrapes ikcopart.com for vehicle parts and prices"
-    },
-    {
-        "name": "Saipa Stopyadak",
-        "module": "scrapers.sapia_stopyadak_scraper",
-        "description": "Scrapes stopyadak.com for Saipa vehicle parts and prices"
-    }
-]
+from orchestrator import SCRAPERS, run_all_concurrently
+from utils.helpers import close_browser_pool
+from utils.matching import run_matching
 
 # ----------------------------------------------------------------------
 # RUN A SINGLE SCRAPER
@@ -51,10 +36,9 @@ async def run_scraper(scraper):
 # RUN ALL SCRAPERS
 # ----------------------------------------------------------------------
 async def run_all():
-    """Runs all scrapers sequentially."""
+    """Runs all scrapers concurrently through the orchestrator."""
     print("\nRUNNING ALL SCRAPERS...")
-    for scraper in SCRAPERS:
-        await run_scraper(scraper)
+    await run_all_concurrently(SCRAPERS)
     print("\nALL SCRAPERS COMPLETE.")
 
 # ----------------------------------------------------------------------
@@ -66,9 +50,10 @@ def show_menu():
     for i, s in enumerate(SCRAPERS, 1):
         print(f"{i}. {s['name']: <20} → {s['description']}")
     print("a. Run ALL scrapers")
+    print("m. Match parts across sites (latest CSVs)")
     print("0. Exit")
     print("=" * 60)
-    choice = input("\nEnter number or 'a': ").strip().lower()
+    choice = input("\nEnter number, 'a' or 'm': ").strip().lower()
     return choice
 
 # ----------------------------------------------------------------------
@@ -87,11 +72,17 @@ async def main():
 
     if choice == "a" or choice == "all":
         await run_all()
+    elif choice == "m":
+        report = run_matching()
+        print(f"\nMATCH REPORT → {report}" if report else "\nNot enough data to match (need CSVs from two sites).")
     else:
         try:
             idx = int(choice) - 1
             if 0 <= idx < len(SCRAPERS):
-                await run_scraper(SCRAPERS[idx])
+                try:
+                    await run_scraper(SCRAPERS[idx])
+                finally:
+                    await close_browser_pool()
             else:
                 print("Invalid choice.")
         except ValueError:
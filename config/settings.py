@@ -3,20 +3,130 @@
 # CENTRAL CONFIG FOR THE PROJECT
 # All scrapers read from this file for shared settings like browser options, fallback, timeouts, and URLs.
 # Edit here to change behavior for all scrapers (e.g., make all headless).
-# Browser fallback: Tries browsers in order from BROWSER_FALLBACK (chromium first, firefox on failure).
+# Browser fallback: Races the BROWSER_FALLBACK engines (the site's usual winner starts first, see ENGINE_RACE).
 # Failure detection: On TimeoutError or if page title contains CLOUDFLARE_TITLE.
 # ======================================================================
 
 # Browser settings (used by all scrapers)
 BROWSER_FALLBACK = ['chromium', 'firefox']  # Fallback list: chromium → firefox on failure
 HEADLESS = False  # True = no browser window (production) | False = see browser (debug)
-SCROLL_WAIT_TIME = 2.0  # Seconds to wait between scrolls for lazy loading
+SCROLL_WAIT_TIME = 2.0  # Longest single wait (seconds) for new items after a scroll
+SCROLL_MIN_WAIT = 0.25  # First wait after a scroll; doubles up to SCROLL_WAIT_TIME while nothing new appears
+SCROLL_QUIET = 1.0  # Scrolling is done after this many seconds without new items and without any XHR / fetch in flight
+SCROLL_IDLE_LIMIT = 6.0  # ... or after this many seconds without new items even while requests are pending (slow batches)
+SCROLL_MAX_TIME = 900  # Hard ceiling (seconds) for scrolling one page
+SCROLL_STREAMING = True  # Stopyadak: extract each new batch while scrolling (False = scroll everything, then extract)
+SCROLL_PRUNE = "spacer"  # Streaming: read items become empty boxes ('spacer'), are deleted ('remove') or stay ('off')
 TIMEOUT = 90000  # Max wait time in ms for page loads (90 seconds)   ← FIXED: was TIMOUT
+READY_TIMEOUT = 30000  # Default budget (ms) of a page-readiness strategy (utils/readiness.py) after domcontentloaded
+READY_TIMEOUTS = {  # Per-site overrides by "site:kind" (e.g. "isaco:detail": 45000); scrapers set their own defaults
+}
+
+# Browser pool (one long-lived browser per engine, shared by all scrapers in the process)
+POOL_MAX_CONTEXTS_PER_BROWSER = 20  # Relaunch a browser after it has handed out this many contexts
+POOL_MAX_MEMORY_MB = 2048  # Relaunch browsers when their total memory (RSS) goes above this
+ENGINE_RACE = True  # Race the BROWSER_FALLBACK engines (first past the block check wins) instead of trying them in turn
+ENGINE_RACE_HEAD_START = 3.0  # Seconds the site's usual winner runs alone before the next engine joins (0 = all at once)
+ENGINE_STATS_PATH = "output/.state/engine_stats.json"  # Per-site engine wins — decides which engine starts first
+SESSION_STATE = True  # Save cookies / localStorage after the anti-bot check and reuse them (skips the challenge)
+SESSION_STATE_DIR = "output/.state"  # One <site>_<engine>.json per site and browser engine
+SESSION_STATE_MAX_AGE_HOURS = 12  # A saved state is dropped after this long (or when its cf_clearance cookie expires)
+
+# Concurrency settings (how many tabs a scraper may keep open at the same time)
+ISACO_CONCURRENCY = 4  # Parallel Isaco detail-page tabs (1 = one card at a time, like before)
+IKCO_CONCURRENCY = 4  # IKCO listing pages (?paged=N) scraped in parallel tabs (1 = page by page)
+MAX_CONCURRENT_BROWSERS = 3  # Global cap: site scrapers (browser sessions) running at the same time
+MAX_CONCURRENT_PAGES = 8  # Global cap: pages loading at the same time across all scrapers
+
+# Resource blocking (aborts requests the scrapers never read: faster loads, less bandwidth)
+BLOCK_RESOURCES = True  # False = load every asset like a normal browser
+BLOCKED_RESOURCE_TYPES = ['image', 'font', 'media']  # Playwright resource types to abort
+BLOCKED_DOMAINS = [  # Third-party trackers / widgets (subdomains are blocked too)
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'facebook.net', 'hotjar.com', 'clarity.ms', 'mc.yandex.ru', 'yektanet.com', 'mediaad.org',
+    'najva.com', 'pushe.co', 'goftino.com', 'raychat.io', 'trustseal.enamad.ir',
+]
+RESOURCE_ALLOW = ['challenges.cloudflare.com', '/cdn-cgi/']  # URL substrings never blocked (anti-bot checks)
+# Per-site overrides: 'allow' = extra URL substrings never blocked, 'deny' = extra domains to block,
+# 'block_types' = replaces BLOCKED_RESOURCE_TYPES for that site
+RESOURCE_RULES = {
+    "isaco": {"allow": [], "deny": []},
+    "ikcopart": {"allow": [], "deny": []},
+    "sapia_stopyadak": {"allow": [], "deny": []},
+}
+
+# Rate limiting (one token bucket per domain, shared by every page and scraper; replaces fixed sleeps)
+# qps = starting requests per second, burst = requests allowed back-to-back, max_qps = ceiling when healthy
+RATE_LIMITS = {
+    "default": {"qps": 1.0, "burst": 2, "max_qps": 3.0},
+    "isaco.ir": {"qps": 1.0, "burst": 2, "max_qps": 2.0},
+    "ikcopart.com": {"qps": 1.0, "burst": 2, "max_qps": 3.0},
+    "stopyadak.com": {"qps": 0.5, "burst": 1, "max_qps": 1.0},
+}
+RATE_LIMIT_JITTER = 0.5  # Extra random wait (0..N seconds) before each request
+RATE_LIMIT_MIN_QPS = 0.05  # Never slower than this (one request per 20 s)
+RATE_LIMIT_BACKOFF = 0.5  # Rate × this on 429 / 503 / challenge page
+RATE_LIMIT_RECOVERY = 1.25  # Rate × this after RATE_LIMIT_RECOVER_AFTER healthy responses in a row
+RATE_LIMIT_RECOVER_AFTER = 10
+
+# Retries (exponential backoff + jitter for timeouts / dropped connections / 429 / 5xx; circuit breaker per site)
+RETRY_ATTEMPTS = 3  # Attempts per navigation / page / card before it goes to the end-of-run retry pass
+RETRY_BASE_DELAY = 2.0  # Seconds before the 2nd attempt; doubles each time (half of it random)
+RETRY_MAX_DELAY = 30.0  # Longest wait between two attempts
+RETRY_BREAKER_THRESHOLD = 5  # Failures in a row that open a site's circuit (calls fail fast) ...
+RETRY_BREAKER_COOLDOWN = 120  # ... for this many seconds
+
+# Output (rows are streamed to disk while scraping; dedup + sort happen when the file is finalized)
+SINK_BATCH_SIZE = 200  # Rows buffered in memory before they are appended to disk
+SINK_SORT_CHUNK_ROWS = 100000  # Rows sorted in memory at a time when finalizing (external merge sort)
+CHECKPOINT_DIR = "output/.checkpoints"  # Finished pages / detail URLs of today's run (a restarted run skips them)
+PARQUET_OUTPUT = False  # True = also write typed Parquet next to the CSV (needs: pip install pyarrow)
+PARQUET_DIR = "output/parquet"  # Parquet dataset, partitioned as site=<site>/scrape_date=<date>/
+PRICE_HISTORY = True  # Record every finalized CSV in the change-only price history (SQLite)
+PRICE_HISTORY_PATH = "output/price_history.sqlite"  # One row per part per price (valid_from / valid_to)
+
+# Backups (content-addressed: identical CSVs are stored once, snapshots are hardlinks)
+BACKUP_DIR = "backups"  # Snapshots (<site>_<date>_backup.csv) + objects/ store
+BACKUP_COMPRESSION = "gzip"  # 'none' | 'gzip' | 'zstd' (zstd needs: pip install zstandard)
+BACKUP_KEEP_DAYS = 90  # Snapshots older than this are removed ...
+BACKUP_KEEP_LAST = 7  # ... except the newest N per site
+
+# Conditional re-crawl (Isaco detail pages read over plain HTTP are checked with a conditional GET first;
+# unchanged pages reuse the rows stored last time. Pages scraped in the browser are never cached:
+# their prices load by XHR / on scroll, which the page's HTML does not reflect)
+PAGE_CACHE = True  # False = always fetch every page
+PAGE_CACHE_PATH = "output/.cache/pages.sqlite"  # Validators (ETag, Last-Modified, HTML hash) + rows per URL
+PAGE_CACHE_MAX_AGE_DAYS = 7  # Fully re-scrape a page at least this often, even if it looks unchanged
+
+# Price normalization (Persian / Arabic digits, Toman vs Rial, ranges → integer price + price_status column)
+PRICE_UNIT = "toman"  # Unit of the price column in every output ('toman' | 'rial')
+PRICE_SITE_UNITS = {  # Unit a site means when the price text names none
+    "isaco": "toman",
+    "ikcopart": "toman",
+    "sapia_stopyadak": "toman",
+}
+PART_INDEX_PATH = "output/part_index.sqlite"  # Canonical part key → stable part_id (same part, same id every day)
+
+# Cross-site part matching (python -m utils.matching → output/matches/matches_<date>.csv)
+MATCH_SITES = ["isaco", "ikcopart", "sapia_stopyadak"]  # Sites compared pairwise (latest daily CSV of each)
+MATCH_MIN_SCORE = 0.6  # Lowest similarity (0..1) reported as a match
+MATCH_CANDIDATES = 20  # Candidates scored per part after blocking
+MATCH_MAX_POSTINGS = 300  # Tokens / n-grams shared by more parts than this are too common to block on
+MATCH_NGRAM = 3  # Character n-gram length
+MATCH_RARE_NGRAMS = 8  # Rarest n-grams of a name used for blocking
+
+# HTTP fast path (plain HTTP/JSON instead of a browser; browser is used only if the site blocks it)
+HTTP_FAST_PATH = True  # False = always use the browser
+HTTP_POOL_SIZE = 10  # Keep-alive connections kept open per host
+HTTP_CONCURRENCY = 4  # Parallel HTTP requests per site
+HTTP_TIMEOUT = 30  # Seconds per HTTP request
 
 # Cloudflare detection string (if page title contains this, switch browser)
 CLOUDFLARE_TITLE = 'Cloudflare'
+CHALLENGE_MIN_TEXT = 1000  # Block check on the start page: less body text than this counts as blocked
 
 # URLs for each scraper (edit if sites change)
 ISACO_URL = "https://www.isaco.ir/قطعات"  # Isaco base URL
 IKCOPART_URL = "https://ikcopart.com/shop/"  # IKCO base URL
-SAPIYA_STOP_YADAK_URL = "https://stopyadak.com/Products/NewProducts"  # Saipa base URL
\ No newline at end of file
+SAPIYA_STOP_YADAK_URL = "https://stopyadak.com/Products/NewProducts"  # Saipa base URL
+IKCOPART_STORE_API = "https://ikcopart.com/wp-json/wc/store/v1/products"  # WooCommerce Store API (HTTP fast path)
\ No newline at end of file
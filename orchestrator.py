@@ -0,0 +1,101 @@
+# orchestrator.py
+# ======================================================================
+# CONCURRENT MULTI-SITE ORCHESTRATOR
+# Runs all site scrapers at the same time instead of one after another.
+# Global caps (MAX_CONCURRENT_BROWSERS / MAX_CONCURRENT_PAGES in config/settings.py)
+# keep the total load bounded; one failing site never stops the others.
+# Used by run_scrapers.py, cli_menu.py ('a') and scheduler.py.
+# ======================================================================
+
+import asyncio
+import importlib
+import time
+
+# --- SHARED UTILS ---
+from utils.helpers import setup_logging, browser_slot, close_browser_pool
+
+# --- LOGGING SETUP ---
+logger = setup_logging()
+
+# ----------------------------------------------------------------------
+# LIST OF SCRAPERS — ADD NEW ONES HERE
+# ----------------------------------------------------------------------
+# Each scraper must have an async def scrape() function (returning the number of rows scraped).
+# Add new scrapers by copying the dict format.
+SCRAPERS = [
+    {
+        "name": "Isaco",
+        "module": "scrapers.isaco_scraper",
+        "description": "Scrapes Isaco.ir for vehicle parts and prices (7200+ rows)"
+    },
+    {
+        "name": "IKCO Part",
+        "module": "scrapers.ikcopart_scraper",
+        "description": "Scrapes ikcopart.com for vehicle parts and prices"
+    },
+    {
+        "name": "Saipa Stopyadak",
+        "module": "scrapers.sapia_stopyadak_scraper",
+        "description": "Scrapes stopyadak.com for Saipa vehicle parts and prices"
+    }
+]
+
+# ----------------------------------------------------------------------
+# RUN ONE SITE (ISOLATED)
+# ----------------------------------------------------------------------
+async def run_site(scraper):
+    """
+    Runs a single scraper inside a browser slot and never raises.
+    :param scraper: Dict from SCRAPERS
+    :return: Result dict with name, status, rows and elapsed seconds
+    """
+    result = {"name": scraper["name"], "status": "OK", "rows": 0, "elapsed": 0.0, "error": ""}
+    async with browser_slot():  # Global cap on browsers running at the same time
+        start_time = time.time()
+        logger.info(f"STARTED → {scraper['name']}")
+        try:
+            mod = importlib.import_module(scraper["module"])  # Load the scraper module
+            result["rows"] = await mod.scrape() or 0
+            if not result["rows"]:
+                result["status"] = "NO DATA"
+        except Exception as e:
+            logger.exception(f"{scraper['name']} failed: {e}")
+            result["status"] = "FAILED"
+            result["error"] = str(e)
+        result["elapsed"] = time.time() - start_time
+    logger.info(f"FINISHED → {scraper['name']} ({result['status']}, {result['elapsed']:.1f}s)")
+    return result
+
+# ----------------------------------------------------------------------
+# RUN ALL SITES CONCURRENTLY
+# ----------------------------------------------------------------------
+async def run_all_concurrently(scrapers=None):
+    """
+    Runs all scrapers at the same time and prints a combined timing summary.
+    Total runtime is that of the slowest site instead of the sum of all sites.
+    :param scrapers: List of scraper dicts (defaults to SCRAPERS)
+    :return: List of result dicts (same order as scrapers)
+    """
+    scrapers = SCRAPERS if scrapers is None else scrapers
+    start_time = time.time()
+    try:
+        results = await asyncio.gather(*(run_site(s) for s in scrapers))
+    finally:
+        await close_browser_pool()  # Browsers are shared by all sites — close them once at the end
+    elapsed = time.time() - start_time
+
+    # --- COMBINED SUMMARY ---
+    print(f"\n{'='*60}")
+    print("ALL SCRAPERS FINISHED")
+    for r in results:
+        line = f"{r['name']: <20} {r['status']: <8} {r['rows']: >7} rows  {r['elapsed']: >8.1f}s"
+        if r["error"]:
+            line += f"  ({r['error']})"
+        print(line)
+    print(f"Total rows: {sum(r['rows'] for r in results)}")
+    print(f"Wall-clock time: {elapsed:.1f} seconds (sum of sites: {sum(r['elapsed'] for r in results):.1f}s)")
+    print(f"{'='*60}\n")
+    return results
+
+if __name__ == "__main__":
+    asyncio.run(run_all_concurrently())
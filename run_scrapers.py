@@ -2,26 +2,22 @@
 # ======================================================================
 # ENTRY POINT TO RUN ALL SCRAPERS MANUALLY
 # Useful for testing or CI/CD triggers.
-# Import and call new scrapers here as you add sites.
+# New scrapers are registered in orchestrator.py (SCRAPERS).
 # ======================================================================
 
 import asyncio
 import sys
-from scrapers.ikcopart_scraper import scrape as scrape_ikcopart
-from scrapers.isaco_scraper import scrape as scrape_isaco
-from scrapers.sapia_stopyadak_scraper import scrape as scrape_sapia_stopyadak
+from orchestrator import run_all_concurrently
 
 async def main():
     """
-    Run all scrapers sequentially.
+    Run all scrapers concurrently (see orchestrator.py).
     """
     print("Starting manual scrape run...")
-    await scrape_ikcopart()
-    await scrape_isaco()
-    await scrape_sapia_stopyadak()
+    await run_all_concurrently()
     print("All scrapers completed.")
 
 if __name__ == "__main__":
     asyncio.run(main())
 
-# Explanation: Simple orchestrator. Run this for one-off tests or in Azure pipeline. Logs trace each scraper's progress.
\ No newline at end of file
+# Explanation: Thin wrapper around orchestrator.py. Run this for one-off tests or in Azure pipeline. Logs trace each scraper's progress.
\ No newline at end of file
@@ -11,20 +11,16 @@ from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
 import asyncio
 
-# Import scraper functions (add new ones here)
-from scrapers.isaco_scraper import scrape as scrape_isaco
-from scrapers.ikcopart_scraper import scrape as scrape_ikcopart
-from scrapers.sapia_stopyadak_scraper import scrape as scrape_sapia_stopyadak
+# Scrapers are registered in orchestrator.py (add new ones there)
+from orchestrator import run_all_concurrently
 
 # ----------------------------------------------------------------------
 # DAILY JOB — RUN ALL SCRAPERS
 # ----------------------------------------------------------------------
 async def daily_job():
-    """Runs all scrapers sequentially at the scheduled time."""
+    """Runs all scrapers concurrently at the scheduled time."""
     print(f"DAILY SCRAPE STARTED at {datetime.now()}")
-    await scrape_isaco()
-    await scrape_ikcopart()
-    await scrape_sapia_stopyadak()
+    await run_all_concurrently()
     print(f"DAILY SCRAPE FINISHED at {datetime.now()}")
 
 # ----------------------------------------------------------------------
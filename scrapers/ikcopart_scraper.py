@@ -2,33 +2,51 @@
 # ======================================================================
 # IKCO PART SCRAPER — FULLY WORKING & DOCUMENTED
 # Scrapes: https://ikcopart.com/shop/ for vehicle parts and prices.
-# Handles JS loading and pagination by looping through pages.
+# Reads the catalog from the WooCommerce Store API over plain HTTP when it is reachable (HTTP fast path).
+# Otherwise handles JS loading and pagination by splitting the page range over IKCO_CONCURRENCY parallel tabs.
 # Extracts part names from class="wd-entities-title" and prices from class="woocommerce-Price-amount.amount bdi".
-# Saves to timestamped CSV in 'output/' folder (e.g., ikcopart_2025-11-09.csv).
-# Uses fallback browser launch from utils/helpers.py (chromium first, firefox on failure).
+# Streams rows to disk while scraping, then saves to timestamped CSV in 'output/' folder (e.g., ikcopart_2025-11-09.csv).
+# Finished pages are checkpointed, so an interrupted run resumes where it stopped.
+# Uses the shared browser pool from utils/helpers.py (chromium first, firefox on failure).
 # For daily runs, use scheduler.py or Windows Task Scheduler.
 # Telegram bot code is commented out — enable when you have a bot.
 # ======================================================================
 
 import asyncio
+import html
 import time
 from pathlib import Path
 
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+from playwright.async_api import TimeoutError as PWTimeout
 
 # --- SHARED UTILS ---
-from utils.helpers import setup_logging, save_to_csv, get_current_date_str, launch_browser_with_fallback
+from utils.helpers import (
+    setup_logging, CsvSink, backup_file, get_current_date_str, browser_session, run_with_browser_pool, page_slot,
+    navigate, extract_records, scroll_until_loaded, gather_or_cancel,
+)
+from utils.http_client import fetch_json, HttpBlocked
+from utils.checkpoint import Checkpoint
+from utils.price_history import record_daily_csv
+from utils.retry import retry_call, RetryQueue, CircuitOpen, get_breaker
+from utils.readiness import register_readiness, SelectorReady
 
 # --- CONFIG FROM SETTINGS ---
-from config.settings import TIMEOUT, SCROLL_WAIT_TIME
+from config.settings import (
+    IKCO_CONCURRENCY,
+    HTTP_FAST_PATH, HTTP_CONCURRENCY, IKCOPART_STORE_API, PRICE_HISTORY,
+)
 
 # --- CONFIGURATION ---
 START_URL = "https://ikcopart.com/shop/"  # Base URL with pagination
+STORE_API_PER_PAGE = 100  # Products per Store API request (WooCommerce maximum)
 
 # --- CSS SELECTORS ---
 PART_NAME_SELECTOR = '.wd-entities-title'
 PRICE_SELECTOR = '.woocommerce-Price-amount.amount bdi'
 
+# --- PAGE READINESS (a listing page is done once its first product is in the DOM — no networkidle wait) ---
+LIST_READY = register_readiness("ikcopart", "list", SelectorReady(PART_NAME_SELECTOR, timeout=30000))
+
 # --- OUTPUT FOLDER ---
 OUTPUT_DIR = Path("output")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -36,119 +54,290 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 # --- LOGGING SETUP ---
 logger = setup_logging()
 
-# =====================================================
-# HELPER: Scroll to load all lazy content
-# =====================================================
-async def scroll_and_load(page):
-    prev_height = 0
-    stable_rounds = 0
-    while stable_rounds < 3:
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        await page.wait_for_timeout(int(SCROLL_WAIT_TIME * 1000))
-        cur_height = await page.evaluate("document.body.scrollHeight")
-        if cur_height == prev_height:
-            stable_rounds += 1
-        else:
-            stable_rounds = 0
-        prev_height = cur_height
-        logger.info(f"Scrolling... Height now: {cur_height}")
-    logger.info("Scrolling complete.")
-
 # =====================================================
 # HELPER: Get total pages
 # =====================================================
 async def get_total_pages(page):
     try:
-        links = await page.query_selector_all(".page-numbers a.page-numbers")
-        numbers = [int(await a.inner_text()) for a in links if (await a.inner_text()).isdigit()]
+        links = await extract_records(page, {"text": ""}, container=".page-numbers a.page-numbers")
+        numbers = [int(link["text"]) for link in links if (link["text"] or "").isdigit()]
         return max(numbers) if numbers else 1
     except:
         return 1
 
 # =====================================================
-# MAIN SCRAPER FUNCTION
+# HELPER: Scrape one listing page
 # =====================================================
-async def scrape():
+def listing_url(pg):
+    """URL of listing page number pg (1-based)."""
+    return f"{START_URL}?paged={pg}" if pg > 1 else START_URL
+
+async def scrape_listing_page(page, pg, total_pages, today):
     """
-    Main function: Opens IKCO shop, loops through all pages, extracts part names and prices, saves to daily CSV.
-    Uses fallback browser launch from utils/helpers.py (chromium first, firefox on failure).
+    Opens listing page number pg, scrolls to load everything and extracts part names and prices.
+    :param page: Playwright page object (a tab owned by this page number)
+    :param pg: Page number (1-based)
+    :param total_pages: Total number of pages (for progress logs)
+    :param today: Date string for the scrape_date column
+    :return: List of row dicts
     """
-    start_time = time.time()
-    all_data = []
-    today = get_current_date_str()
+    url = listing_url(pg)
+    await navigate(page, url, ready=LIST_READY)
+    logger.info(f"Scraping page {pg}/{total_pages}: {url}")
+
+    await scroll_until_loaded(page, PART_NAME_SELECTOR)
+
+    # All names and prices in one round-trip (paired by index)
+    records = await extract_records(page, {"part_name": PART_NAME_SELECTOR, "price": PRICE_SELECTOR})
+
+    data = []
+    for record in records:
+        part_name = (record["part_name"] or "").strip()
+        price_raw = (record["price"] or "").strip()  # Cleaned by the sink (utils/normalize.py)
+        if part_name and price_raw:
+            data.append({
+                "part_name": part_name,
+                "price": price_raw,
+                "source_url": url,
+                "scrape_date": today
+            })
+    return data
+
+# =====================================================
+# HELPER: Scrape all listing pages in parallel tabs
+# =====================================================
+async def scrape_all_pages(context, total_pages, today, sink, checkpoint):
+    """
+    Splits pages 1..total_pages over parallel tabs (at most IKCO_CONCURRENCY at once) and streams each page's rows to the sink.
+    Each page gets RETRY_ATTEMPTS tries with backoff (utils/retry.py); pages that still fail are tried once more
+    at the end, the other pages still get saved. Pages already in the checkpoint are skipped.
+    A page refused by the open circuit breaker waits for the cooldown and is tried then (not a failure).
+    Listing pages are not cached: most of their items load on scroll, so the page's HTML does not cover them.
+    :param context: Browser context to open the tabs in
+    :param total_pages: Number of listing pages
+    :param today: Date string for the scrape_date column
+    :param sink: CsvSink the rows are streamed to (order does not matter — the CSV is sorted when finalized)
+    :param checkpoint: Checkpoint each finished page is recorded in
+    :return: Number of pages that failed
+    """
+    semaphore = asyncio.Semaphore(max(1, IKCO_CONCURRENCY))
+    retries = RetryQueue("ikcopart")
+
+    async def open_and_scrape(pg):
+        async with page_slot():  # Global page cap shared with the other scrapers
+            tab = await context.new_page()
+            try:
+                return await scrape_listing_page(tab, pg, total_pages, today)
+            finally:
+                await tab.close()
+
+    async def run_page(pg, final=False):
+        while True:
+            async with semaphore:  # Site limit
+                try:
+                    rows = await retry_call("ikcopart", open_and_scrape, pg, label=f"page {pg}")
+                    checkpoint.record(f"page:{pg}", rows)
+                    sink.write(rows)
+                    return 0
+                except CircuitOpen:
+                    pass  # Not tried yet — wait for the site to cool down (outside the site limit), then try it
+                except Exception as e:
+                    if not final:
+                        retries.add(pg, e)
+                        return 0
+                    logger.error(f"Failed on page {pg}: {e}")
+                    return 1
+            await get_breaker("ikcopart").wait()
+
+    pending = [pg for pg in range(1, total_pages + 1) if not checkpoint.is_done(f"page:{pg}")]
+    if len(pending) < total_pages:
+        logger.info(f"Resuming: {total_pages - len(pending)} pages already done")
+    await asyncio.gather(*(run_page(pg) for pg in pending))
+
+    # One more pass over the pages that failed (after the site's circuit cooled down)
+    if not retries:
+        return 0
+    await retries.wait()
+    pages = retries.take()
+    logger.info(f"Retry pass: {len(pages)} pages")
+    failed = await asyncio.gather(*(run_page(pg, final=True) for pg in pages))
+    return sum(failed)
+
+# =====================================================
+# FAST PATH: WooCommerce Store API over plain HTTP
+# =====================================================
+def store_product_to_row(product, today):
+    """Turns one Store API product into a CSV row (None if it has no name or price)."""
+    prices = product.get("prices") or {}
+    price_raw = str(prices.get("price") or "")
+    minor_unit = int(prices.get("currency_minor_unit") or 0)
+    price = str(int(price_raw) // (10 ** minor_unit)) if price_raw.isdigit() else ""
+    part_name = html.unescape(product.get("name") or "").strip()
+    if not (part_name and price):
+        return None
+    currency = prices.get("currency_code") or ""  # 'IRT' (Toman) / 'IRR' (Rial) — read by the sink's normalizer
+    return {
+        "part_name": part_name,
+        "price": f"{price} {currency}".strip(),
+        "source_url": product.get("permalink") or START_URL,
+        "scrape_date": today
+    }
+
+async def scrape_via_http(today, sink, checkpoint):
+    """
+    Reads the whole catalog from the WooCommerce Store API (JSON, STORE_API_PER_PAGE products per request).
+    :param today: Date string for the scrape_date column
+    :param sink: CsvSink the rows are streamed to
+    :param checkpoint: Checkpoint of finished API pages (keys 'api:N')
+    :return: True if the catalog was read, False if the API is blocked / unavailable (→ browser fallback)
+    """
+    def write_products(pg, products):
+        if checkpoint.is_done(f"api:{pg}"):  # Page 1 is always fetched (for the page count)
+            return
+        rows = [store_product_to_row(product, today) for product in products]
+        rows = [row for row in rows if row]
+        checkpoint.record(f"api:{pg}", rows)
+        sink.write(rows)
+
+    try:
+        params = {"per_page": STORE_API_PER_PAGE, "page": 1}
+        products, response = await retry_call(
+            "ikcopart", fetch_json, IKCOPART_STORE_API, params=params, label="Store API page 1"
+        )
+        total_pages = int(response.headers.get("X-WP-TotalPages") or 1)
+        logger.info(f"Store API: {total_pages} pages of {STORE_API_PER_PAGE} products")
+        write_products(1, products)
 
-    async with async_playwright() as p:
-        page, context = await launch_browserfallback(p, START_URL)
+        semaphore = asyncio.Semaphore(max(1, HTTP_CONCURRENCY))
+
+        async def fetch_page(pg):
+            async with semaphore:
+                page_products, _ = await retry_call(
+                    "ikcopart", fetch_json, IKCOPART_STORE_API, params={**params, "page": pg}, label=f"Store API page {pg}"
+                )
+                write_products(pg, page_products)
+
+        # One failed page cancels the rest — nothing may write into the sink after it was reset for the browser
+        await gather_or_cancel(*(
+            fetch_page(pg) for pg in range(2, total_pages + 1) if not checkpoint.is_done(f"api:{pg}")
+        ))
+
+    except HttpBlocked as e:
+        logger.warning(f"Store API blocked ({e}) — falling back to the browser")
+        return False
+    except Exception as e:
+        logger.warning(f"Store API unavailable ({e}) — falling back to the browser")
+        return False
+
+    logger.info(f"Store API: {sink.row_count} rows")
+    return sink.row_count > 0
+
+# =====================================================
+# BROWSER PATH
+# =====================================================
+async def scrape_with_browser(today, sink, checkpoint):
+    """
+    Opens IKCO shop in the browser and scrapes all listing pages in parallel tabs.
+    :param today: Date string for the scrape_date column
+    :param sink: CsvSink the rows are streamed to
+    :param checkpoint: Checkpoint of finished listing pages (keys 'page:N')
+    :return: True if every listing page was scraped
+    """
+    async with browser_session("ikcopart", START_URL) as (page, context):
         if not page:
             logger.error("Failed to launch browser — exiting")
-            return
+            return False
 
         try:
-            await page.goto(START_URL, wait_until="networkidle", timeout=TIMEOUT)
+            await retry_call("ikcopart", navigate, page, START_URL, ready=LIST_READY, label="start page")
             total_pages = await get_total_pages(page)
             logger.info(f"Found {total_pages} pages")
 
-            for pg in range(1, total_pages + 1):
-                url = f"{START_URL}?paged={pg}" if pg > 1 else START_URL
-                await page.goto(url, wait_until="networkidle", timeout=TIMEOUT)
-                logger.info(f"Scraping page {pg}/{total_pages}: {url}")
-
-                await scroll_and_load(page)
-
-                names = await page.query_selector_all(PART_NAME_SELECTOR)
-                prices = await page.query_selector_all(PRICE_SELECTOR)
-
-                for name_elem, price_elem in zip(names, prices):
-                    part_name = (await name_elem.inner_text()).strip()
-                    price_raw = (await price_elem.inner_text()).strip()
-                    price = "".join(filter(str.isdigit, price_raw))
-                    if part_name and price:
-                        all_data.append({
-                            "part_name": part_name,
-                            "price": price,
-                            "source_url": url,
-                            "scrape_date": today
-                        })
-
-            if all_data:
-                csv_path = OUTPUT_DIR / f"ikcopart_{today}.csv"
-                save_to_csv(all_data, "ikcopart")
-                logger.info(f"SAVED {len(all_data)} ROWS → {csv_path}")
-
-                # --- AUTO BACKUP ---
-                backup_dir = Path("backups")
-                backup_dir.mkdir(exist_ok=True)
-                import shutil
-                shutil.copy(csv_path, backup_dir / f"ikcopart_{today}_backup.csv")
-
-                # --- TELEGRAM ALERT (COMMENTED) ---
-                # import requests
-                # def send_telegram(msg):
-                #     TOKEN = "YOUR_BOT_TOKEN"
-                #     CHAT_ID = "YOUR_CHAT_ID"
-                #     url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
-                #     try:
-                #         requests.post(url, data={"chat_id": CHAT_ID, "text": msg})
-                #     except:
-                #         logger.warning("Telegram send failed")
-                # send_telegram(f"IKCO SCRAPED\n{len(all_data)} rows\n{time.strftime('%H:%M')}")
-
-            else:
-                logger.warning("NO DATA COLLECTED")
+            logger.info(f"Scraping with {min(max(1, IKCO_CONCURRENCY), total_pages)} parallel tabs")
+            return await scrape_all_pages(context, total_pages, today, sink, checkpoint) == 0
 
         except Exception as e:
             logger.exception(f"CRITICAL ERROR: {e}")
-        finally:
-            if context and context.browser:
-                await context.browser.close()
+            return False
+
+# =====================================================
+# MAIN SCRAPER FUNCTION
+# =====================================================
+async def scrape():
+    """
+    Main function: Reads IKCO from the Store API when possible, otherwise opens IKCO shop in the browser and
+    scrapes all pages in parallel tabs. Extracts part names and prices, streams them to disk and
+    finalizes the daily CSV.
+    Uses the shared browser pool from utils/helpers.py (chromium first, firefox on failure).
+    :return: Number of rows scraped (used by the orchestrator summary)
+    """
+    start_time = time.time()
+    today = get_current_date_str()
+    sink = CsvSink("ikcopart")  # Rows go to disk in batches as they are scraped
+    checkpoint = Checkpoint("ikcopart", today)
+    checkpoint.replay(sink)  # Rows of pages finished by an interrupted run today
+
+    # --- FAST PATH: Store API, browser only if it is blocked or unavailable ---
+    # A browser run interrupted today is resumed in the browser: its replayed listing rows and
+    # Store API rows have different source_urls, so the CSV would hold both
+    resume_browser = checkpoint.has_prefix("page:")
+    if resume_browser:
+        logger.info("Resuming the interrupted browser run — Store API skipped")
+    done = HTTP_FAST_PATH and not resume_browser and await scrape_via_http(today, sink, checkpoint)
+
+    # --- BROWSER PATH ---
+    if not done:
+        # Drop partial Store API rows — the browser run covers everything (API and listing pages differ)
+        checkpoint.forget("api:")
+        sink.reset()
+        checkpoint.replay(sink)
+        done = await scrape_with_browser(today, sink, checkpoint)
+
+    rows_scraped = sink.row_count
+    try:
+        csv_path = sink.finalize()
+        if done:
+            checkpoint.clear()  # Everything is in the CSV — the next run starts fresh
+        else:
+            checkpoint.close()
+            logger.warning("Some pages failed — run again to retry only those")
+        if csv_path:
+            logger.info(f"SAVED {rows_scraped} ROWS → {csv_path}")
+
+            # --- PRICE HISTORY (only price changes are stored) ---
+            if PRICE_HISTORY:
+                record_daily_csv(csv_path, "ikcopart", today, full_snapshot=done)
+
+            # --- AUTO BACKUP (content-addressed: unchanged content is hardlinked, not copied) ---
+            backup_path = backup_file(csv_path)
+            logger.info(f"BACKUP → {backup_path}")
+
+            # --- TELEGRAM ALERT (COMMENTED) ---
+            # import requests
+            # def send_telegram(msg):
+            #     TOKEN = "YOUR_BOT_TOKEN"
+            #     CHAT_ID = "YOUR_CHAT_ID"
+            #     url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+            #     try:
+            #         requests.post(url, data={"chat_id": CHAT_ID, "text": msg})
+            #     except:
+            #         logger.warning("Telegram send failed")
+            # send_telegram(f"IKCO SCRAPED\n{rows_scraped} rows\n{time.strftime('%H:%M')}")
+
+        else:
+            logger.warning("NO DATA COLLECTED")
+
+    except Exception as e:
+        logger.exception(f"CRITICAL ERROR: {e}")
 
     elapsed = time.time() - start_time
     print(f"\n{'='*60}")
     print(f"IKCO SCRAPER FINISHED")
-    print(f"Rows saved: {len(all_data)}")
+    print(f"Rows saved: {rows_scraped}")
     print(f"Time taken: {elapsed:.1f} seconds")
     print(f"Output: {OUTPUT_DIR}/ikcopart_{today}.csv")
     print(f"{'='*60}\n")
+    return rows_scraped
 
 if __name__ == "__main__":
-    asyncio.run(scrape())
\ No newline at end of file
+    asyncio.run(run_with_browser_pool(scrape))
\ No newline at end of file
@@ -2,9 +2,12 @@
 # ======================================================================
 # ISACO SCRAPER — FULLY WORKING & DOCUMENTED
 # Scrapes: https://www.isaco.ir/قطعات for vehicle parts and prices (7200+ rows).
-# Handles JS loading by waiting for cards, clicks "مشاهده قیمت", extracts table rows.
-# Saves to timestamped CSV in 'output/' folder (e.g., isaco_2025-11-09.csv).
-# Uses fallback browser launch from utils/helpers.py (chromium first, firefox on failure).
+# Reads the Next.js page data over plain HTTP when it carries the prices (HTTP fast path).
+# Otherwise handles JS loading by waiting for cards, clicks "مشاهده قیمت", extracts table rows.
+# Streams rows to disk while scraping, then saves to timestamped CSV in 'output/' folder (e.g., isaco_2025-11-09.csv).
+# Finished detail pages are checkpointed, so an interrupted run resumes where it stopped.
+# Detail pages read over plain HTTP that are unchanged since the last run (conditional GET) reuse their cached rows.
+# Uses the shared browser pool from utils/helpers.py (chromium first, firefox on failure).
 # For daily runs, use scheduler.py or Windows Task Scheduler.
 # Telegram bot code is commented out — enable when you have a bot.
 # ======================================================================
@@ -14,21 +17,55 @@ import time
 from urllib.parse import urljoin
 from pathlib import Path
 
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+from playwright.async_api import TimeoutError as PWTimeout
 
 # --- SHARED UTILS ---
-from utils.helpers import setup_logging, save_to_csv, get_current_date_str, launch_browser_with_fallback
+from utils.helpers import (
+    setup_logging, CsvSink, backup_file, get_current_date_str, browser_session, run_with_browser_pool, page_slot,
+    navigate, extract_json_records, ResponseCapture, extract_records, gather_or_cancel,
+)
+from utils.http_client import fetch, extract_next_data, extract_links, HttpBlocked
+from utils.checkpoint import Checkpoint
+from utils.page_cache import PageCache
+from utils.price_history import record_daily_csv
+from utils.retry import retry_call, RetryQueue, CircuitOpen, get_breaker
+from utils.readiness import register_readiness, SelectorReady
 
 # --- CONFIG FROM SETTINGS ---
-from config.settings import TIMEOUT, SCROLL_WAIT_TIME   # ← FIXED: TIMOUT → TIMEOUT
+from config.settings import ISACO_CONCURRENCY, HTTP_FAST_PATH, HTTP_CONCURRENCY, PRICE_HISTORY
 
 # --- CONFIGURATION ---
 START_URL = "https://www.isaco.ir/قطعات"  # Base URL
 
 # --- CSS SELECTORS (from your specs) ---
-CARD_SELECTOR = 'div.Parts_partsItem__josVI'  # Product card
+CARD_CLASS = 'Parts_partsItem__josVI'  # Product card class (also used by the HTTP fast path)
+CARD_SELECTOR = f'div.{CARD_CLASS}'  # Product card
 SHOW_PRICE_BTN = '.MuiButton-containedPrimary'  # "مشاهده قیمت" button
 TABLE_ROW = 'tr.PartsDetails_rowOfTable__vm_Zw'  # Price table rows
+TABLE_FIELDS = {  # Cells inside one price table row
+    "part_number": ':scope > td:nth-of-type(1)',
+    "part_name": ':scope > td:nth-of-type(2)',
+    "brand": ':scope > td:nth-of-type(3)',
+    "price": ':scope > td:nth-of-type(4)',
+}
+
+# --- PAGE READINESS (a navigation is done once these are in the DOM — no networkidle wait) ---
+LIST_READY = register_readiness("isaco", "list", SelectorReady(CARD_SELECTOR, timeout=60000))
+DETAIL_READY = register_readiness("isaco", "detail", SelectorReady(SHOW_PRICE_BTN, timeout=30000, state="visible"))
+PRICE_CLICKS = 3  # "مشاهده قیمت" clicks per page before giving up (an early click can hit an unhydrated button)
+PRICE_TABLE_TIMEOUT = 10000  # ms to wait for the price table after each click
+
+# --- CAPTURED RESPONSES (XHR/fetch URLs worth reading; empty = every JSON response) ---
+# Whatever matches is cross-checked against the price table's row count before it replaces the DOM
+CAPTURE_URL_PATTERNS = []
+
+# --- JSON FIELD NAMES (Next.js page data and captured responses — first key found wins) ---
+JSON_FIELDS = {
+    "part_number": ["partNumber", "partNo", "PartNumber", "technicalNumber", "code"],
+    "part_name": ["partName", "PartName", "name", "title", "Title"],
+    "brand": ["brand", "brandName", "BrandName", "manufacturer"],
+    "price": ["price", "Price", "finalPrice", "consumerPrice", "salePrice"],
+}
 
 # --- OUTPUT FOLDER ---
 OUTPUT_DIR = Path("output")  # Folder for CSVs (auto-created)
@@ -38,150 +75,378 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 logger = setup_logging()
 
 # =====================================================
-# HELPER: Click button with timeout
+# HELPER: Click "مشاهده قیمت" until the price table shows up
 # =====================================================
-async def wait_and_click(page, selector, timeout=30000):
+async def open_price_table(page):
     """
-    Waits for a button/link to appear and clicks it.
+    Clicks "مشاهده قیمت" and waits for the price table rows. Without a networkidle wait the server-rendered
+    button can be clicked before React has hydrated it — that click does nothing, so it is repeated
+    (PRICE_CLICKS times, PRICE_TABLE_TIMEOUT ms each) instead of waiting out one long timeout.
     :param page: Playwright page object
-    :param selector: CSS selector
-    :param timeout: Max wait in ms
+    :raises PWTimeout: if the table never appears
+    """
+    for click in range(1, PRICE_CLICKS + 1):
+        await page.click(SHOW_PRICE_BTN, timeout=PRICE_TABLE_TIMEOUT)
+        try:
+            await page.wait_for_selector(TABLE_ROW, timeout=PRICE_TABLE_TIMEOUT)
+            return
+        except PWTimeout:
+            if click == PRICE_CLICKS:
+                raise
+            logger.info(f"  → No price table after click {click} — clicking again")
+
+# =====================================================
+# HELPER: Scrape one detail page
+# =====================================================
+async def scrape_detail(page, full_url, today):
+    """
+    Opens a detail page, clicks "مشاهده قیمت" and extracts the price table rows
+    (from the captured JSON response if there is one, otherwise from the DOM).
+    Not cached: the prices arrive by XHR after the click, so the page's HTML says nothing about them.
+    :param page: Playwright page object (a worker tab, reused between URLs)
+    :param full_url: Absolute URL of the detail page
+    :param today: Date string for the scrape_date column
+    :return: List of row dicts
     """
+    capture = ResponseCapture(page, CAPTURE_URL_PATTERNS)  # Attach before navigating
     try:
-        await page.wait_for_selector(selector, timeout=timeout)
-        await page.click(selector)
-        logger.info(f"Clicked: {selector}")
-    except PWTimeout:
-        logger.error(f"Timeout: Could not find or click → {selector}")
+        await navigate(page, full_url, ready=DETAIL_READY)
+
+        # Click "مشاهده قیمت" and wait for the price table
+        await open_price_table(page)
+
+        # Prefer the JSON the page fetched for its price table (no per-cell round-trips) —
+        # only if it has exactly one record per table row (any JSON XHR could match the generic keys)
+        records = await capture.records(JSON_FIELDS, required=("part_number", "part_name", "price"))
+        table_rows = await page.locator(TABLE_ROW).count()
+    finally:
+        capture.stop()
+    if records and len(records) != table_rows:
+        logger.info(f"  → Captured JSON has {len(records)} records for {table_rows} table rows — reading the table")
+        records = []
+    if records:
+        logger.info(f"  → Found {len(records)} price rows (captured JSON)")
+        data = [json_record_to_row(r, full_url, today) for r in records]
+    else:
+        data = await extract_table_rows(page, full_url, today)
+    return data
+
+async def extract_table_rows(page, full_url, today):
+    """Reads the price table rows from the DOM (all rows in one round-trip)."""
+    rows = await extract_records(page, TABLE_FIELDS, container=TABLE_ROW)
+    logger.info(f"  → Found {len(rows)} price rows")
+
+    data = []
+    for row in rows:
+        if row["price"] is not None:  # Rows with fewer than 4 cells are skipped
+            part_no = (row["part_number"] or "").strip()
+            name = (row["part_name"] or "").strip()
+            brand = (row["brand"] or "").strip()
+            price = row["price"].strip()  # Cleaned by the sink (utils/normalize.py)
+
+            data.append({
+                "part_number": part_no,
+                "part_name": name,
+                "brand": brand,
+                "price": price,
+                "source_url": full_url,
+                "scrape_date": today
+            })
+    return data
 
 # =====================================================
-# MAIN SCRAPER FUNCTION
+# HELPER: Detail-page worker (one tab fed from a shared queue)
 # =====================================================
-async def scrape():
+async def detail_worker(worker_id, context, queue, sink, checkpoint, total, today, retries=None):
     """
-    Main function: Opens the Isaco page, loops through all product cards, clicks "مشاهده قیمت", extracts table data, saves to daily CSV.
-    Uses fallback browser launch from utils/helpers.py (chromium first, firefox on failure).
+    Takes (card index, URL) items off the queue until it is empty and scrapes each one in its own tab.
+    Pages are paced by the shared per-domain rate limiter (navigate()), not by a fixed per-worker sleep.
+    Each card gets RETRY_ATTEMPTS tries with backoff (utils/retry.py); a card that still fails
+    goes onto the retry queue (or counts as failed in the retry pass itself). A card refused by the open
+    circuit breaker was never tried: it goes back on the queue and the worker waits for the cooldown.
+    :param worker_id: Number used in log lines
+    :param context: Browser context to open the worker tab in
+    :param queue: asyncio.Queue of (idx, full_url) tuples
+    :param sink: CsvSink the rows are streamed to
+    :param checkpoint: Checkpoint each finished URL is recorded in
+    :param total: Total number of cards (for progress logs)
+    :param today: Date string for the scrape_date column
+    :param retries: RetryQueue failed cards are added to (None = retry pass, count them as failed)
+    :return: Number of detail pages that failed
     """
-    start_time = time.time()
-    all_data = []  # List to hold part data
-    today = get_current_date_str()  # e.g., 2025-11-09
+    failed = 0
+    page = await context.new_page()
+
+    async def open_detail(full_url):
+        nonlocal page
+        if page.is_closed():  # Tab crashed on a previous attempt — open a fresh one
+            page = await context.new_page()
+        async with page_slot():  # Global page cap shared with the other scrapers
+            return await scrape_detail(page, full_url, today)
+
+    try:
+        while True:
+            try:
+                idx, full_url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+
+            try:
+                logger.info(f"[W{worker_id}] [{idx}/{total}] Opening: {full_url}")
+                rows = await retry_call("isaco", open_detail, full_url, label=f"card {idx}")
+                checkpoint.record(full_url, rows)
+                sink.write(rows)
+            except CircuitOpen:
+                queue.put_nowait((idx, full_url))  # Not tried yet — back in line once the site cooled down
+                await get_breaker("isaco").wait()
+            except Exception as e:
+                if retries is not None:
+                    retries.add((idx, full_url), e)
+                else:
+                    logger.error(f"Failed on card {idx}: {e}")
+                    failed += 1
+    finally:
+        if not page.is_closed():
+            await page.close()
+    return failed
+
+# =====================================================
+# FAST PATH: Next.js page data over plain HTTP
+# =====================================================
+def json_record_to_row(record, source_url, today):
+    """Turns a record from extract_json_records() into a CSV row."""
+    return {
+        "part_number": record.get("part_number", ""),
+        "part_name": record["part_name"],
+        "brand": record.get("brand", ""),
+        "price": record["price"],  # Cleaned by the sink (utils/normalize.py)
+        "source_url": source_url,
+        "scrape_date": today
+    }
+
+async def scrape_via_http(today, sink, checkpoint, cache):
+    """
+    Reads parts and prices from the __NEXT_DATA__ JSON that Next.js embeds in each page — no browser.
+    Tries the list page first, then the detail pages (HTTP_CONCURRENCY at a time).
+    :param today: Date string for the scrape_date column
+    :param sink: CsvSink the rows are streamed to
+    :param checkpoint: Checkpoint of finished detail URLs (skipped here, recorded when fetched)
+    :param cache: PageCache — unchanged detail pages are answered with a 304 / identical HTML
+    :return: True if the whole catalog was read, False if blocked / the data is not (all) in the HTML
+             (→ browser fallback for the pages not checkpointed)
+    """
+    try:
+        response = await retry_call("isaco", fetch, START_URL, label="list page (HTTP)")
+        next_data = extract_next_data(response.text)
+        records = extract_json_records(next_data, JSON_FIELDS) if next_data else []
+        links = [urljoin(response.url, href) for href in extract_links(response.text, CARD_CLASS)]
+        # Only a catalog if it covers every card (a few featured items would close all other parts in the history)
+        if records and links and len(records) >= len(links):
+            logger.info(f"HTTP fast path: {len(records)} rows from list page data")
+            # The list page replaces the detail pages — drop rows replayed from an interrupted run today
+            checkpoint.forget("http")  # Detail units are keyed by URL
+            sink.reset()
+            sink.write([json_record_to_row(r, START_URL, today) for r in records])
+            return True
+        if records:
+            logger.info(f"HTTP fast path: list page data has {len(records)} rows for {len(links)} cards — not the catalog")
 
-    # --- Start Playwright browser with fallback ---
-    async with async_playwright() as p:
-        page, context = await launch_browser_with_fallback(p, START_URL)
+        if not links:
+            logger.info("HTTP fast path: no cards in server HTML — using the browser")
+            return False
+        links = [url for url in links if not checkpoint.is_done(url)]
+        logger.info(f"HTTP fast path: {len(links)} detail pages left")
+        if not links:
+            return True
+
+        semaphore = asyncio.Semaphore(max(1, HTTP_CONCURRENCY))
+
+        async def fetch_detail(url, use_cache=True):
+            async with semaphore:
+                rows, detail = await cache.revalidate(url, today) if use_cache else (None, None)
+                if rows is None:
+                    # Reuse the revalidation response if the page changed
+                    detail = detail or await retry_call("isaco", fetch, url, label="detail page (HTTP)")
+                    data = extract_next_data(detail.text)
+                    rows = [
+                        json_record_to_row(r, url, today)
+                        for r in (extract_json_records(data, JSON_FIELDS) if data else [])
+                    ]
+                    if rows:
+                        cache.store(url, rows, detail.headers, detail.text)
+                if rows:  # An empty page is left for the browser, not marked as done
+                    checkpoint.record(url, rows)
+                    sink.write(rows)
+                return rows
+
+        # Probe the first detail page — if prices only appear after the button click, stop here
+        # (fetched for real: cached rows say nothing about whether today's HTML carries the prices)
+        if not await fetch_detail(links[0], use_cache=False):
+            logger.info("HTTP fast path: no prices in detail page data — using the browser")
+            return False
+        # One failed page cancels the rest, so no fetch keeps running next to the browser fallback
+        results = await gather_or_cancel(*(fetch_detail(url) for url in links[1:]))
+        empty = sum(1 for rows in results if not rows)
+        if empty:  # Not checkpointed — the browser scrapes just those
+            logger.info(f"HTTP fast path: {empty} detail pages without prices — using the browser for them")
+        return not empty
+
+    except HttpBlocked as e:
+        logger.warning(f"HTTP fast path blocked ({e}) — falling back to the browser")
+        return False
+    except Exception as e:
+        logger.warning(f"HTTP fast path failed ({e}) — falling back to the browser")
+        return False
+
+# =====================================================
+# BROWSER PATH
+# =====================================================
+async def scrape_with_browser(today, sink, checkpoint):
+    """
+    Opens the Isaco page, collects all product cards and scrapes their detail pages with
+    ISACO_CONCURRENCY worker tabs. Detail pages already in the checkpoint are skipped.
+    :param today: Date string for the scrape_date column
+    :param sink: CsvSink the rows are streamed to
+    :param checkpoint: Checkpoint of finished detail URLs
+    :return: True if every detail page was scraped
+    """
+    # --- Get a stealth browser context from the shared pool ---
+    async with browser_session("isaco", START_URL) as (page, context):
         if not page:
             logger.error("Failed to launch browser — exiting")
-            return
+            return False
 
         try:
-            # --- STEP 1: Open the base URL ---
+            # --- STEP 1: Open the base URL (done as soon as the product cards are there) ---
             logger.info(f"Navigating to: {START_URL}")
-            await page.goto(START_URL, wait_until="networkidle", timeout=TIMEOUT)
+            await retry_call("isaco", navigate, page, START_URL, ready=LIST_READY, label="start page")
 
-            # --- STEP 2: Wait for product cards ---
-            await page.wait_for_selector(CARD_SELECTOR, timeout=60000)
-            cards = await page.query_selector_all(CARD_SELECTOR)
+            # --- STEP 2: Read the product cards ---
+            # The href of the <a> inside each card, all in one round-trip
+            cards = await extract_records(page, {"href": "a@href"}, container=CARD_SELECTOR)
             logger.info(f"Found {len(cards)} product cards")
 
-            # --- STEP 3: Loop through each card ---
+            # --- STEP 3: Collect detail URLs from each card ---
+            queue = asyncio.Queue()
             for idx, card in enumerate(cards, 1):
-                try:
-                    # Get the <a> link inside the card
-                    link_elem = await card.query_selector('a')
-                    if not link_elem:
-                        logger.warning(f"Card {idx}: No link found")
-                        continue
-
-                    href = await link_elem.get_attribute("href")
-                    full_url = urljoin(page.url, href)  # Make full URL
-                    logger.info(f"[{idx}/{len(cards)}] Opening: {full_url}")
-
-                    # Open detail page in new tab
-                    new_page = await context.new_page()
-                    await new_page.goto(full_url, wait_until="networkidle", timeout=TIMEOUT)
-
-                    # --- STEP 4: Click "مشاهده قیمت" ---
-                    await wait_and_click(new_page, SHOW_PRICE_BTN)
-
-                    # --- STEP 5: Wait for price table ---
-                    await new_page.wait_for_selector(TABLE_ROW, timeout=30000)
-
-                    # --- STEP 6: Extract each row ---
-                    rows = await new_page.query_selector_all(TABLE_ROW)
-                    logger.info(f"  → Found {len(rows)} price rows")
-
-                    for row in rows:
-                        tds = await row.query_selector_all("td")
-                        if len(tds) >= 4:
-                            part_no = (await tds[0].inner_text()).strip()
-                            name = (await tds[1].inner_text()).strip()
-                            brand = (await tds[2].inner_text()).strip()
-                            price_raw = (await tds[3].inner_text()).strip()
-                            price = "".join(filter(str.isdigit, price_raw))  # Clean price to integer
-
-                            all_data.append({
-                                "part_number": part_no,
-                                "part_name": name,
-                                "brand": brand,
-                                "price": price,
-                                "source_url": full_url,
-                                "scrape_date": today
-                            })
-
-                    # Close tab and small delay
-                    await new_page.close()
-                    await asyncio.sleep(1)  # Be gentle
-
-                except Exception as e:
-                    logger.error(f"Failed on card {idx}: {e}")
+                href = card["href"]
+                if not href:
+                    logger.warning(f"Card {idx}: No link found")
+                    continue
+                full_url = urljoin(page.url, href)  # Make full URL
+                if not checkpoint.is_done(full_url):  # Finished by an earlier run today
+                    queue.put_nowait((idx, full_url))
+
+            # --- STEP 4: Open detail pages with a bounded pool of worker tabs ---
+            workers = max(1, min(ISACO_CONCURRENCY, queue.qsize()))
+            logger.info(f"Scraping {queue.qsize()} detail pages with {workers} worker tabs")
+            retries = RetryQueue("isaco")
+            await asyncio.gather(*(
+                detail_worker(w, context, queue, sink, checkpoint, len(cards), today, retries)
+                for w in range(1, workers + 1)
+            ))
 
-            # --- STEP 7: Save to daily CSV ---
-            if all_data:
-                csv_path = OUTPUT_DIR / f"isaco_{today}.csv"
-                save_to_csv(all_data, "isaco")  # Use helper to save
-                logger.info(f"SAVED {len(all_data)} ROWS → {csv_path}")
-
-                # --- AUTO BACKUP ---
-                backup_dir = Path("backups")
-                backup_dir.mkdir(exist_ok=True)
-                import shutil
-                shutil.copy(csv_path, backup_dir / f"isaco_{today}_backup.csv")
-                logger.info(f"BACKUP → backups/isaco_{today}_backup.csv")
-
-                # --- TELEGRAM ALERT (COMMENTED) ---
-                # To enable: Create bot with @BotFather on Telegram, get TOKEN and CHAT_ID
-                # Un comment and fill in
-                # import requests
-                # def send_telegram(msg):
-                #     TOKEN = "YOUR_BOT_TOKEN"  # e.g., "123456:ABC-DEF1234ghIkl-zyx57W2v1u123ew11"
-                #     CHAT_ID = "YOUR_CHAT_ID"  # e.g., "123456789"
-                #     url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
-                #     try:
-                #         requests.post(url, data={"chat_id": CHAT_ID, "text": msg})
-                #     except:
-                #         logger.warning("Telegram send failed")
-                # send_telegram(f"ISACO SCRAPED\n{len(all_data)} rows\n{time.strftime('%H:%M')}")
-
-            else:
-                logger.warning("NO DATA COLLECTED — Check selectors or internet")
+            # --- STEP 5: One more pass over the cards that failed (after the site's circuit cooled down) ---
+            if retries:
+                await retries.wait()
+                for item in retries.take():
+                    queue.put_nowait(item)
+                workers = max(1, min(ISACO_CONCURRENCY, queue.qsize()))
+                logger.info(f"Retry pass: {queue.qsize()} detail pages with {workers} worker tabs")
+                failed = await asyncio.gather(*(
+                    detail_worker(w, context, queue, sink, checkpoint, len(cards), today)
+                    for w in range(1, workers + 1)
+                ))
+                return sum(failed) == 0
+            return True
 
         except Exception as e:
             logger.exception(f"CRITICAL ERROR: {e}")
-        finally:
-            if context and context.browser:
-                await context.browser.close()
+            return False
+
+# =====================================================
+# MAIN SCRAPER FUNCTION
+# =====================================================
+async def scrape():
+    """
+    Main function: Reads Isaco over plain HTTP when possible, otherwise opens the Isaco page in the browser,
+    collects all product cards, opens their detail pages with ISACO_CONCURRENCY worker tabs
+    (click "مشاهده قیمت", extract table data). Rows are streamed to disk and finalized into the daily CSV.
+    Uses the shared browser pool from utils/helpers.py (chromium first, firefox on failure).
+    :return: Number of rows scraped (used by the orchestrator summary)
+    """
+    start_time = time.time()
+    today = get_current_date_str()  # e.g., 2025-11-09
+    sink = CsvSink("isaco")  # Rows go to disk in batches as they are scraped
+    checkpoint = Checkpoint("isaco", today)
+    checkpoint.replay(sink)  # Rows of detail pages finished by an interrupted run today
+
+    # --- FAST PATH: plain HTTP, browser only if blocked or the data isn't in the HTML ---
+    # Fast-path rows stay in the sink: they are checkpointed, so the browser skips those pages
+    if HTTP_FAST_PATH:
+        cache = PageCache()  # Validators + rows of every detail page read over HTTP in earlier runs
+        done = await scrape_via_http(today, sink, checkpoint, cache)
+        cache.log_summary("isaco")
+        cache.close()
+    else:
+        done = False
+
+    # --- BROWSER PATH ---
+    if not done:
+        done = await scrape_with_browser(today, sink, checkpoint)
+
+    rows_scraped = sink.row_count
+    try:
+        # --- STEP 6: Finalize the daily CSV (dedup + sort) ---
+        csv_path = sink.finalize()
+        if done:
+            checkpoint.clear()  # Everything is in the CSV — the next run starts fresh
+        else:
+            checkpoint.close()
+            logger.warning("Some detail pages failed — run again to retry only those")
+        if csv_path:
+            logger.info(f"SAVED {rows_scraped} ROWS → {csv_path}")
+
+            # --- PRICE HISTORY (only price changes are stored) ---
+            if PRICE_HISTORY:
+                record_daily_csv(csv_path, "isaco", today, full_snapshot=done)
+
+            # --- AUTO BACKUP (content-addressed: unchanged content is hardlinked, not copied) ---
+            backup_path = backup_file(csv_path)
+            logger.info(f"BACKUP → {backup_path}")
+
+            # --- TELEGRAM ALERT (COMMENTED) ---
+            # To enable: Create bot with @BotFather on Telegram, get TOKEN and CHAT_ID
+            # Un comment and fill in
+            # import requests
+            # def send_telegram(msg):
+            #     TOKEN = "YOUR_BOT_TOKEN"  # e.g., "123456:ABC-DEF1234ghIkl-zyx57W2v1u123ew11"
+            #     CHAT_ID = "YOUR_CHAT_ID"  # e.g., "123456789"
+            #     url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+            #     try:
+            #         requests.post(url, data={"chat_id": CHAT_ID, "text": msg})
+            #     except:
+            #         logger.warning("Telegram send failed")
+            # send_telegram(f"ISACO SCRAPED\n{rows_scraped} rows\n{time.strftime('%H:%M')}")
+
+        else:
+            logger.warning("NO DATA COLLECTED — Check selectors or internet")
+
+    except Exception as e:
+        logger.exception(f"CRITICAL ERROR: {e}")
 
     # --- FINAL SUMMARY ---
     elapsed = time.time() - start_time
     print(f"\n{'='*60}")
     print(f"ISACO SCRAPER FINISHED")
-    print(f"Rows saved: {len(all_data)}")
+    print(f"Rows saved: {rows_scraped}")
     print(f"Time taken: {elapsed:.1f} seconds")
     print(f"Output: {OUTPUT_DIR}/isaco_{today}.csv")
     print(f"{'='*60}\n")
+    return rows_scraped
 
 # =====================================================
 # RUN DIRECTLY (for testing)
 # =====================================================
 if __name__ == "__main__":
-    asyncio.run(scrape())
\ No newline at end of file
+    asyncio.run(run_with_browser_pool(scrape))
\ No newline at end of file
@@ -3,9 +3,11 @@
 # SAIPA STOP YADAK SCRAPER — FULLY WORKING & DOCUMENTED
 # Scrapes: https://stopyadak.com/Products/NewProducts for Saipa vehicle parts and prices.
 # Handles JS loading and lazy loading by scrolling to the bottom until no new content loads.
-# Extracts part names from class="ti-pr" and prices from class="p-tx-num".
-# Saves to timestamped CSV in 'output/' folder (e.g., sapia_stopyadak_2025-11-09.csv).
-# Uses fallback browser launch from utils/helpers.py (chromium first, firefox on failure).
+# Streaming (SCROLL_STREAMING): every batch the scroll loads is read (part names class="ti-pr",
+# prices class="p-tx-num"), written to disk and pruned from the DOM, so the page stays small.
+# Otherwise: reads the lazy-load JSON batches the page fetches itself, falling back to the DOM at the end.
+# Streams rows to disk, then saves to timestamped CSV in 'output/' folder (e.g., sapia_stopyadak_2025-11-09.csv).
+# Uses the shared browser pool from utils/helpers.py (chromium first, firefox on failure).
 # For daily runs, use scheduler.py or Windows Task Scheduler.
 # Telegram bot code is commented out — enable when you have a bot.
 # ======================================================================
@@ -14,13 +16,17 @@ import asyncio
 import time
 from pathlib import Path
 
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
-
 # --- SHARED UTILS ---
-from utils.helpers import setup_logging, save_to_csv, get_current_date_str, launch_browser_with_fallback
+from utils.helpers import (
+    setup_logging, CsvSink, backup_file, get_current_date_str, browser_session, navigate, run_with_browser_pool,
+    ResponseCapture, extract_records, scroll_until_loaded, scroll_and_stream,
+)
+from utils.retry import retry_call
+from utils.readiness import register_readiness, SelectorReady, AllReady
+from utils.price_history import record_daily_csv
 
 # --- CONFIG FROM SETTINGS ---
-from config.settings import TIMEOUT, SCROLL_WAIT_TIME
+from config.settings import PRICE_HISTORY, SCROLL_STREAMING
 
 # --- CONFIGURATION ---
 START_URL = "https://stopyadak.com/Products/NewProducts"
@@ -29,6 +35,19 @@ START_URL = "https://stopyadak.com/Products/NewProducts"
 PART_NAME_SELECTOR = '.ti-pr'
 PRICE_SELECTOR = '.p-tx-num'
 
+# --- PAGE READINESS (done once names and prices are in the DOM — no networkidle wait) ---
+LIST_READY = register_readiness("sapia_stopyadak", "list", AllReady(
+    SelectorReady(PART_NAME_SELECTOR, timeout=30000),
+    SelectorReady(PRICE_SELECTOR, timeout=30000),
+))
+
+# --- CAPTURED RESPONSES (lazy-load XHR/fetch batches; empty = every JSON response) ---
+CAPTURE_URL_PATTERNS = []
+JSON_FIELDS = {  # Our column → candidate JSON keys (first key found wins)
+    "part_name": ["title", "Title", "name", "Name", "productName", "ProductName"],
+    "price": ["price", "Price", "finalPrice", "FinalPrice", "salePrice", "SalePrice"],
+}
+
 # --- OUTPUT FOLDER ---
 OUTPUT_DIR = Path("output")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -37,138 +56,150 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 logger = setup_logging()   # ← FIXED: was missing
 
 # =====================================================
-# HELPER: Scroll to load all lazy content
+# HELPER: Open the product list and wait for the first items
 # =====================================================
-async def scroll_and_load_all(page):
-    """
-    Scrolls to the bottom of the page repeatedly until no new content loads.
-    :param page: Playwright page object
-    """
-    prev_height = 0
-    stable_rounds = 0
-    while stable_rounds < 3:  # Stable for 3 rounds = no more loading
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        await page.wait_for_timeout(int(SCROLL_WAIT_TIME * 1000))  # Wait for JS to load new items
-        cur_height = await page.evaluate("document.body.scrollHeight")
-        if cur_height == prev_height:
-            stable_rounds += 1
-        else:
-            stable_rounds = 0
-        prev_height = cur_height
-        logger.info(f"Scrolling... Height now: {cur_height}")
-    logger.info(f"Scrolling complete. No more lazy loading.")
+async def open_listing(page):
+    """Navigates to START_URL and waits for names and prices (PWTimeout if they never show up)."""
+    await navigate(page, START_URL, ready=LIST_READY)
+
+# =====================================================
+# HELPER: Records (part_name / price) → CSV rows
+# =====================================================
+def to_rows(records, today):
+    """Rows for the sink; records without a name or a price are skipped (prices are cleaned by the sink)."""
+    rows = []
+    for record in records:
+        part_name = (record["part_name"] or "").strip()
+        price_raw = (record["price"] or "").strip()
+        if part_name and price_raw:
+            rows.append({
+                "part_name": part_name,
+                "price": price_raw,
+                "source_url": START_URL,
+                "scrape_date": today
+            })
+    return rows
 
 # =====================================================
 # MAIN SCRAPER FUNCTION
 # =====================================================
 async def scrape():
     """
-    Main function: Opens the Saipa page, scrolls to load all items, extracts part names and prices, saves to daily CSV.
-    Uses fallback browser launch from utils/helpers.py (chromium first, firefox on failure).
+    Main function: Opens the Saipa page, scrolls to load all items, extracts part names and prices,
+    streams them to disk and finalizes the daily CSV.
+    Uses the shared browser pool from utils/helpers.py (chromium first, firefox on failure).
+    :return: Number of rows scraped (used by the orchestrator summary)
     """
     start_time = time.time()
-    all_data = []  # List to hold part data
     today = get_current_date_str()  # e.g., 2025-11-09
+    sink = CsvSink("sapia_stopyadak")  # Rows go to disk in batches as they are extracted
+    done = False  # True once the whole catalog was scrolled and extracted
 
-    # --- Start Playwright browser with fallback ---
-    async with async_playwright() as p:
-        page, context = await launch_browser_with_fallback(p, START_URL)
+    # --- Get a stealth browser context from the shared pool ---
+    async with browser_session("sapia_stopyadak", START_URL) as (page, context):
         if not page:
             logger.error("Failed to launch browser — exiting")
-            return
+            sink.discard()
+            return 0
 
+        # Attach before navigating (not when streaming: the DOM batches are written as they load)
+        capture = None if SCROLL_STREAMING else ResponseCapture(page, CAPTURE_URL_PATTERNS)
         try:
-            # --- STEP 1: Open the base URL (with retry on error) ---
+            # --- STEP 1: Open the base URL (RETRY_ATTEMPTS tries with backoff, utils/retry.py) ---
             logger.info(f"Navigating to: {START_URL}")
-            for attempt in range(3):  # Retry up to 3 times
-                try:
-                    await page.goto(START_URL, wait_until="networkidle", timeout=TIMEOUT)
-                    await page.wait_for_selector('.ti-pr', timeout=30000)
-                    await page.wait_for_selector('.p-tx-num', timeout=30000)
-                    break  # Success — exit loop
-                except PWTimeout:
-                    logger.error(f"Timeout on attempt {attempt+1} — retrying...")
-                    await asyncio.sleep(5)  # Wait before retry
-                except Exception as e:
-                    logger.error(f"Navigation error: {e} — retrying...")
-                    await asyncio.sleep(5)
-            else:
-                logger.error("Failed to load page after 3 attempts — check internet or site status")
-                return  # Exit if failed
-
-            # --- STEP 2: Scroll to load all lazy content ---
-            await scroll_and_load_all(page)
-
-            # --- STEP 3: Extract all part names and prices ---
-            names = await page.query_selector_all(PART_NAME_SELECTOR)
-            prices = await page.query_selector_all(PRICE_SELECTOR)
-
-            logger.info(f"Found {len(names)} part names and {len(prices)} prices")
-
-            # --- STEP 4: Pair names and prices (assume 1:1 order) ---
-            for idx, (name_elem, price_elem) in enumerate(zip(names, prices)):
-                try:
-                    part_name = (await name_elem.inner_text()).strip()
-                    price_raw = (await price_elem.inner_text()).strip()
-                    price = "".join(filter(str.isdigit, price_raw))  # Clean price to integer
-
-                    if part_name and price:
-                        all_data.append({
-                            "part_name": part_name,
-                            "price": price,
-                            "source_url": START_URL,
-                            "scrape_date": today
-                        })
-                except Exception as e:
-                    logger.error(f"Error on item {idx}: {e}")
-
-            # --- STEP 5: Save to daily CSV ---
-            if all_data:
-                csv_path = OUTPUT_DIR / f"sapia_stopyadak_{today}.csv"
-                save_to_csv(all_data, "sapia_stopyadak")  # Use helper to save
-                logger.info(f"SAVED {len(all_data)} ROWS → {csv_path}")
-
-                # --- AUTO BACKUP ---
-                backup_dir = Path("backups")
-                backup_dir.mkdir(exist_ok=True)
-                import shutil
-                shutil.copy(csv_path, backup_dir / f"sapia_stopyadak_{today}_backup.csv")
-                logger.info(f"BACKUP → backups/sapia_stopyadak_{today}_backup.csv")
-
-                # --- TELEGRAM ALERT (COMMENTED) ---
-                # To enable: Create bot with @BotFather on Telegram, get TOKEN and CHAT_ID
-                # Un comment and fill in
-                # import requests
-                # def send_telegram(msg):
-                #     TOKEN = "YOUR_BOT_TOKEN"  # e.g., "123456:ABC-DEF1234ghIkl-zyx57W2v1u123ew11"
-                #     CHAT_ID = "YOUR_CHAT_ID"  # e.g., "123456789"
-                #     url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
-                #     try:
-                #         requests.post(url, data={"chat_id": CHAT_ID, "text": msg})
-                #     except:
-                #         logger.warning("Telegram send failed")
-                # send_telegram(f"SAIPA SCRAPED\n{len(all_data)} rows\n{time.strftime('%H:%M')}")
-
+            try:
+                await retry_call("sapia_stopyadak", open_listing, page, label="product list")
+            except Exception as e:
+                logger.error(f"Failed to load page ({e}) — check internet or site status")
+                sink.discard()
+                return 0  # Exit if failed
+
+            if SCROLL_STREAMING:
+                # --- STEP 2: Scroll; each loaded batch is written to disk and pruned from the DOM ---
+                streamed, complete = await scroll_and_stream(
+                    page, PART_NAME_SELECTOR, {"part_name": PART_NAME_SELECTOR, "price": PRICE_SELECTOR},
+                    lambda records: sink.write(to_rows(records, today)),
+                )
+                logger.info(f"Streamed {streamed} name/price pairs")
             else:
-                logger.warning("NO DATA COLLECTED — Check selectors or internet")
+                # --- STEP 2: Scroll to load all lazy content ---
+                _, complete = await scroll_until_loaded(page, PART_NAME_SELECTOR)
+
+                # --- STEP 3: Prefer the JSON batches the page loaded itself ---
+                # Only used if they cover every item on the page (the first batch may be server-rendered HTML)
+                captured = await capture.records(JSON_FIELDS)
+                dom_count = await page.locator(PART_NAME_SELECTOR).count()
+                if captured and len(captured) >= dom_count:
+                    logger.info(f"Using {len(captured)} items from captured JSON ({dom_count} in the DOM)")
+                    # Prices are cleaned by the sink (utils/normalize.py)
+                    sink.write([{
+                        "part_name": record["part_name"],
+                        "price": record["price"],
+                        "source_url": START_URL,
+                        "scrape_date": today
+                    } for record in captured])
+                else:
+                    # --- STEP 4: Extract all part names and prices from the DOM ---
+                    # All names and prices in one round-trip, paired by index (assume 1:1 order)
+                    records = await extract_records(page, {"part_name": PART_NAME_SELECTOR, "price": PRICE_SELECTOR})
+                    logger.info(f"Found {len(records)} name/price pairs")
+                    sink.write(to_rows(records, today))
+            done = complete
 
         except Exception as e:
             logger.exception(f"CRITICAL ERROR: {e}")
         finally:
-            if context and context.browser:
-                await context.browser.close()
+            if capture:
+                capture.stop()
+
+    rows_scraped = sink.row_count
+    try:
+        # --- STEP 5: Finalize the daily CSV (dedup + sort) ---
+        csv_path = sink.finalize()
+        if csv_path:
+            logger.info(f"SAVED {rows_scraped} ROWS → {csv_path}")
+
+            # --- PRICE HISTORY (only price changes are stored) ---
+            # A partial run (error / scroll ceiling) must not close the parts it never reached
+            if PRICE_HISTORY:
+                record_daily_csv(csv_path, "sapia_stopyadak", today, full_snapshot=done)
+
+            # --- AUTO BACKUP (content-addressed: unchanged content is hardlinked, not copied) ---
+            backup_path = backup_file(csv_path)
+            logger.info(f"BACKUP → {backup_path}")
+
+            # --- TELEGRAM ALERT (COMMENTED) ---
+            # To enable: Create bot with @BotFather on Telegram, get TOKEN and CHAT_ID
+            # Un comment and fill in
+            # import requests
+            # def send_telegram(msg):
+            #     TOKEN = "YOUR_BOT_TOKEN"  # e.g., "123456:ABC-DEF1234ghIkl-zyx57W2v1u123ew11"
+            #     CHAT_ID = "YOUR_CHAT_ID"  # e.g., "123456789"
+            #     url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+            #     try:
+            #         requests.post(url, data={"chat_id": CHAT_ID, "text": msg})
+            #     except:
+            #         logger.warning("Telegram send failed")
+            # send_telegram(f"SAIPA SCRAPED\n{rows_scraped} rows\n{time.strftime('%H:%M')}")
+
+        else:
+            logger.warning("NO DATA COLLECTED — Check selectors or internet")
+
+    except Exception as e:
+        logger.exception(f"CRITICAL ERROR: {e}")
 
     # --- FINAL SUMMARY ---
     elapsed = time.time() - start_time
     print(f"\n{'='*60}")
     print(f"SAIPA SCRAPER FINISHED")
-    print(f"Rows saved: {len(all_data)}")
+    print(f"Rows saved: {rows_scraped}")
     print(f"Time taken: {elapsed:.1f} seconds")
     print(f"Output: {OUTPUT_DIR}/sapia_stopyadak_{today}.csv")
     print(f"{'='*60}\n")
+    return rows_scraped
 
 # =====================================================
 # RUN DIRECTLY (for testing)
 # =====================================================
 if __name__ == "__main__":
-    asyncio.run(scrape())
\ No newline at end of file
+    asyncio.run(run_with_browser_pool(scrape))
\ No newline at end of file
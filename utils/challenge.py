@@ -0,0 +1,102 @@
+# utils/challenge.py
+# ======================================================================
+# CHALLENGE / BLOCK DETECTION (CHEAP ENOUGH FOR EVERY NAVIGATION)
+# Decides whether a response is an anti-bot page from:
+#   1. status + headers (cf-mitigated, server: cloudflare / arvancloud / ddos-guard with a 403)
+#   2. the page title
+#   3. a small DOM probe: a handful of challenge-widget selectors and the body's text length —
+#      evaluated in the browser, only a few bytes come back (no page.text_content("body")).
+# Used by navigate() / open_and_check() in utils/helpers.py and by the HTTP fast path.
+# ======================================================================
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import CLOUDFLARE_TITLE
+
+# Status an anti-bot layer blocks with (429 / 503 alone are overload — retried, not a challenge)
+BLOCK_STATUS = 403
+# Statuses after which a browser navigation is not usable (retried with backoff like a challenge)
+THROTTLE_STATUS = {429, 503}
+# "server" header values of anti-bot / CDN layers
+PROTECTION_SERVERS = ("cloudflare", "arvancloud", "ddos-guard")
+# Lowercase title substrings of challenge / block pages
+CHALLENGE_TITLES = (
+    CLOUDFLARE_TITLE.lower(), "just a moment", "attention required", "checking your browser",
+    "access denied", "ddos-guard", "arvancloud",
+)
+# Lowercase substrings of challenge HTML (HTTP fast path: first bytes of the body)
+CHALLENGE_MARKERS = (
+    "just a moment", "checking your browser", "cf-browser-verification", "challenges.cloudflare.com",
+    "/cdn-cgi/challenge-platform", "cf_chl_opt",
+)
+# Elements that only challenge pages have
+CHALLENGE_SELECTORS = [
+    "#challenge-form", "#challenge-stage", "#challenge-running", "#cf-challenge-running",
+    ".cf-browser-verification", "#cf-wrapper", "[name='cf-turnstile-response']",
+    "iframe[src*='challenges.cloudflare.com']", "script[src*='/cdn-cgi/challenge-platform']",
+]
+
+# Title, first challenge selector present and body text length — one small round-trip
+PROBE_JS = """
+(selectors) => ({
+    title: document.title || "",
+    marker: selectors.find(s => document.querySelector(s)) || null,
+    textLength: document.body ? document.body.textContent.length : 0,
+})
+"""
+
+class ChallengeDetected(Exception):
+    """The site served an anti-bot / challenge page instead of the content."""
+
+def _header(headers, name):
+    # Playwright headers are lowercase dicts, requests' are case-insensitive
+    return ((headers or {}).get(name) or "").lower()
+
+def check_response(status=None, headers=None, title: str = "", html_head: str = ""):
+    """
+    Classifies a response without touching the page.
+    :param status: HTTP status (None if unknown)
+    :param headers: Response headers (dict-like; Playwright headers are lowercase)
+    :param title: Page title, if known
+    :param html_head: First bytes of the HTML, if known (HTTP fast path)
+    :return: Reason string if it is a challenge / block page, else None
+             (a plain 429 / 503 is not: the HTTP path lets raise_for_status() retry it)
+    """
+    if _header(headers, "cf-mitigated") == "challenge":
+        return "cf-mitigated: challenge"
+    server = _header(headers, "server")
+    if status == BLOCK_STATUS and (any(s in server for s in PROTECTION_SERVERS) or _header(headers, "cf-ray")):
+        return f"HTTP {status} from {server or 'cloudflare'}"
+    title = (title or "").lower()
+    for marker in CHALLENGE_TITLES:
+        if marker and marker in title:
+            return f"challenge title '{title[:60]}'"
+    head = (html_head or "").lower()
+    for marker in CHALLENGE_MARKERS:
+        if marker in head:
+            return f"challenge marker '{marker}' in HTML"
+    return None
+
+async def detect_challenge(page, response=None, min_text: int = 0):
+    """
+    Checks the page a navigation ended on (status / headers of response + one DOM probe).
+    :param page: Playwright page
+    :param response: Response returned by page.goto() (None = DOM probe only)
+    :param min_text: A body with less text than this counts as blocked (0 = no check)
+    :return: Reason string if it is a challenge / block page, else None
+    """
+    status = response.status if response else None
+    headers = response.headers if response else None
+    reason = check_response(status, headers)
+    if reason:
+        return reason
+    if status in THROTTLE_STATUS:  # The page is an error page either way — fail fast instead of waiting for data
+        return f"HTTP {status}"
+    probe = await page.evaluate(PROBE_JS, CHALLENGE_SELECTORS)
+    if probe["marker"]:
+        return f"challenge element {probe['marker']}"
+    reason = check_response(title=probe["title"])
+    if reason:
+        return reason
+    if probe["textLength"] < min_text:
+        return f"near-empty page ({probe['textLength']} chars)"
+    return None
@@ -0,0 +1,109 @@
+# utils/checkpoint.py
+# ======================================================================
+# CHECKPOINT / RESUME FOR LONG RUNS
+# One small SQLite file per site and day under output/.checkpoints/.
+# Every finished unit of work (an Isaco detail URL, an IKCO page) is stored with its rows,
+# so a restarted run skips finished work and replays the stored rows into the new CSV sink.
+# The file is deleted once the day's CSV has been finalized.
+# ======================================================================
+
+import json
+import logging
+import sqlite3
+from pathlib import Path
+
+# --- SHARED UTILS ---
+from utils.helpers import get_current_date_str
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import CHECKPOINT_DIR
+
+logger = logging.getLogger(__name__)
+
+class Checkpoint:
+    """
+    Persistent record of finished work units for one site and day.
+    Usage:
+        checkpoint = Checkpoint("isaco")
+        checkpoint.replay(sink)                 # rows finished by an earlier run today
+        if not checkpoint.is_done(url):
+            rows = ...
+            checkpoint.record(url, rows)
+        ...
+        checkpoint.clear()                      # after the CSV is finalized
+    """
+
+    def __init__(self, site: str, run_date: str = None, directory: str = CHECKPOINT_DIR):
+        """
+        :param site: Site key (e.g. 'isaco')
+        :param run_date: Day the checkpoint belongs to (default: today)
+        :param directory: Folder for the checkpoint files
+        """
+        run_date = run_date or get_current_date_str()
+        folder = Path(directory)
+        folder.mkdir(parents=True, exist_ok=True)
+        self.path = folder / f"{site}_{run_date}.sqlite"
+
+        # Checkpoints of earlier days belong to runs that will never be resumed
+        for stale in folder.glob(f"{site}_*.sqlite"):
+            if stale != self.path:
+                stale.unlink(missing_ok=True)
+
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            " key TEXT PRIMARY KEY,"
+            " rows TEXT NOT NULL,"
+            " done_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+        )
+        self.conn.commit()
+        self._done = {key for (key,) in self.conn.execute("SELECT key FROM units")}
+        if self._done:
+            logger.info(f"Resuming {site}: {len(self._done)} units already done ({self.path})")
+
+    def is_done(self, key: str) -> bool:
+        """True if the unit was finished by this or an earlier run today."""
+        return key in self._done
+
+    def has_prefix(self, prefix: str) -> bool:
+        """True if any finished unit's key starts with prefix (e.g. 'page:' — a browser run was interrupted)."""
+        return any(key.startswith(prefix) for key in self._done)
+
+    def record(self, key: str, rows: list[dict]):
+        """Stores a finished unit and its rows (committed right away)."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO units (key, rows) VALUES (?, ?)",
+            (key, json.dumps(rows, ensure_ascii=False)),
+        )
+        self.conn.commit()
+        self._done.add(key)
+
+    def replay(self, sink) -> int:
+        """
+        Writes the rows of every finished unit into the sink (streamed from SQLite).
+        :return: Number of units replayed
+        """
+        count = 0
+        for (rows,) in self.conn.execute("SELECT rows FROM units ORDER BY rowid"):
+            sink.write(json.loads(rows))
+            count += 1
+        return count
+
+    def forget(self, prefix: str):
+        """Drops units whose key starts with prefix (e.g. Store API pages before a browser fallback)."""
+        self.conn.execute("DELETE FROM units WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+        self.conn.commit()
+        self._done = {key for key in self._done if not key.startswith(prefix)}
+
+    def clear(self):
+        """Deletes the checkpoint (call after the day's CSV was finalized)."""
+        self.conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+        self._done = set()
+
+    def close(self):
+        """Closes the database but keeps the checkpoint for the next run."""
+        self.conn.close()
@@ -2,18 +2,49 @@
 # ======================================================================
 # SHARED UTILITIES — FULL MANUAL STEALTH (NO playwright-stealth)
 # Works on Python 3.13.7 — Bypasses Cloudflare & anti-bot on stopyadak.com
-# Uses Playwright's built-in evasion + Iranian mobile UA + human delays
+# Uses Playwright's built-in evasion + Iranian mobile UA + per-domain rate limiting with jitter
 # ======================================================================
 
 import os
+import re
+import csv
+import gzip
+import heapq
+import shutil
+import hashlib
+import io
+import itertools
+import asyncio
 import logging
-from datetime import datetime
-import pandas as pd
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import psutil
 from pathlib import Path
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+from urllib.parse import urlsplit
+from playwright.async_api import async_playwright
+
+# --- OPTIONAL OUTPUTS ---
+from utils.parquet_sink import write_parquet
+from utils.normalize import normalize_rows, canonical_keys
+from utils.rate_limit import get_rate_limiter, domain_of
+from utils.session_state import get_session_store, EngineStats
+from utils.challenge import detect_challenge, ChallengeDetected
+from utils.readiness import disarm
+try:
+    import zstandard  # Optional: BACKUP_COMPRESSION = 'zstd'
+except ImportError:
+    zstandard = None
 
 # --- CONFIG FROM SETTINGS ---
-from config.settings import BROWSER_FALLBACK, HEADLESS, TIMEOUT, CLOUDFLARE_TITLE
+from config.settings import (
+    BROWSER_FALLBACK, HEADLESS, TIMEOUT, CHALLENGE_MIN_TEXT,
+    MAX_CONCURRENT_BROWSERS, MAX_CONCURRENT_PAGES,
+    POOL_MAX_CONTEXTS_PER_BROWSER, POOL_MAX_MEMORY_MB, ENGINE_RACE, ENGINE_RACE_HEAD_START,
+    SCROLL_WAIT_TIME, SCROLL_MIN_WAIT, SCROLL_QUIET, SCROLL_IDLE_LIMIT, SCROLL_MAX_TIME, SCROLL_PRUNE,
+    SINK_BATCH_SIZE, SINK_SORT_CHUNK_ROWS, PARQUET_OUTPUT,
+    BACKUP_DIR, BACKUP_COMPRESSION, BACKUP_KEEP_DAYS, BACKUP_KEEP_LAST,
+    BLOCK_RESOURCES, BLOCKED_RESOURCE_TYPES, BLOCKED_DOMAINS, RESOURCE_ALLOW, RESOURCE_RULES,
+)
 
 # ----------------------------------------------------------------------
 # SETUP LOGGING
@@ -31,22 +62,691 @@ def setup_logging(log_dir: str = "logs"):
     )
     return logging.getLogger(__name__)
 
+# ----------------------------------------------------------------------
+# STREAMING CSV SINK (rows go to disk in batches while the scraper runs)
+# ----------------------------------------------------------------------
+class CsvSink:
+    """
+    Appends rows to a hidden partial file (output/.<prefix>_<date>.partial.csv) every SINK_BATCH_SIZE rows,
+    so memory stays flat and a crash keeps everything scraped so far.
+    finalize() removes duplicate rows and sorts by the canonical part_name key with an external merge sort
+    (SINK_SORT_CHUNK_ROWS rows in memory at a time), then atomically renames the result to
+    output/<prefix>_<date>.csv (UTF-8 BOM for Excel). Every batch is normalized first (utils/normalize.py:
+    Persian text cleanup, integer price in PRICE_UNIT + price_status, stable part_id); rows that differ only
+    in how the name is spelled dedup together. With PARQUET_OUTPUT the CSV is also written
+    as typed Parquet (see utils/parquet_sink.py).
+    Usage:
+        sink = CsvSink("isaco")
+        sink.write(rows)          # any number of times
+        csv_path = sink.finalize()
+    """
+
+    def __init__(self, prefix: str, output_dir: str = "output"):
+        """
+        :param prefix: File name prefix (e.g. 'isaco')
+        :param output_dir: Folder for the CSV
+        """
+        today = get_current_date_str()
+        self.prefix = prefix
+        self.today = today
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.final_path = self.output_dir / f"{prefix}_{today}.csv"
+        self.partial_path = self.output_dir / f".{prefix}_{today}.partial.csv"
+        self.columns = None
+        self._buffer = []
+        self.rows_written = 0
+        self.partial_path.unlink(missing_ok=True)  # Interrupted runs are resumed from their checkpoint
+
+    @property
+    def row_count(self) -> int:
+        """Rows received so far (written + still buffered)."""
+        return self.rows_written + len(self._buffer)
+
+    def write(self, rows):
+        """Adds rows (list of dicts); appends them to disk once a full batch is buffered."""
+        self._buffer.extend(rows)
+        if len(self._buffer) >= SINK_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Normalizes the buffered rows (whole batch at once) and appends them to the partial file."""
+        if not self._buffer:
+            return
+        batch = normalize_rows(self._buffer, self.prefix)
+        new_file = self.columns is None
+        columns = list(self.columns or [])
+        for row in batch:
+            columns.extend(key for key in row if key not in columns)
+        if new_file:
+            self.columns = columns
+        elif len(columns) > len(self.columns):
+            self._widen(columns)
+        with open(self.partial_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns, restval="")
+            if new_file:
+                writer.writeheader()
+            writer.writerows(batch)
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def _widen(self, columns):
+        """Rewrites the partial file with extra columns (a key first seen in a later batch; rare)."""
+        padding = [""] * (len(columns) - len(self.columns))
+        tmp_path = self.partial_path.with_name(self.partial_path.name + ".tmp")
+        with open(self.partial_path, newline="", encoding="utf-8") as f_in, \
+                open(tmp_path, "w", newline="", encoding="utf-8") as f_out:
+            reader = csv.reader(f_in)
+            writer = csv.writer(f_out)
+            next(reader, None)  # Old header
+            writer.writerow(columns)
+            writer.writerows(row + padding for row in reader)
+        os.replace(tmp_path, self.partial_path)
+        logging.info(f"{self.prefix}: new columns {columns[len(self.columns):]} — partial file widened")
+        self.columns = columns
+
+    def reset(self):
+        """Drops everything written so far (e.g. before falling back from the HTTP path to the browser)."""
+        self._buffer = []
+        self.columns = None
+        self.rows_written = 0
+        self.partial_path.unlink(missing_ok=True)
+
+    def discard(self):
+        """Throws the run away without writing a CSV."""
+        self.reset()
+
+    def finalize(self):
+        """
+        Dedups + sorts the partial file into the daily CSV (atomic rename).
+        :return: Path of the CSV, or None if no rows were written
+        """
+        self.flush()
+        if not self.rows_written:
+            logging.warning("No data to save.")
+            self.partial_path.unlink(missing_ok=True)
+            return None
+
+        # Run files hold [canonical part_name key] + row; rows that differ only in how the name is
+        # spelled (ZWNJ vs space, ...) share the key and the same part_id, so they dedup to one row
+        name_col = self.columns.index("part_name") + 1 if "part_name" in self.columns else None
+        runs = self._write_sorted_runs(name_col)
+        tmp_path = self.final_path.with_name(self.final_path.name + ".tmp")
+        files = [open(run, newline="", encoding="utf-8") for run in runs]
+        kept = 0
+        try:
+            with open(tmp_path, "w", newline="", encoding="utf-8-sig") as out:
+                writer = csv.writer(out)
+                writer.writerow(self.columns)
+                previous = None
+                merged = heapq.merge(*(csv.reader(f) for f in files), key=lambda row: _sort_key(row, name_col))
+                for row in merged:
+                    key = _dedup_key(row, name_col)
+                    if key != previous:  # Duplicates are adjacent after sorting (dedup key is a prefix of the sort key)
+                        writer.writerow(row[1:])
+                        kept += 1
+                    previous = key
+            os.replace(tmp_path, self.final_path)
+        finally:
+            for f in files:
+                f.close()
+            for run in runs:
+                run.unlink(missing_ok=True)
+            tmp_path.unlink(missing_ok=True)
+        self.partial_path.unlink(missing_ok=True)
+        logging.info(f"Saved {kept} rows to {self.final_path} with UTF-8 BOM")
+
+        if PARQUET_OUTPUT:
+            try:
+                write_parquet(self.final_path, self.prefix, self.today)
+            except Exception as e:  # The CSV is already saved — never lose it over the extra format
+                logging.error(f"Parquet output failed: {e}")
+        return self.final_path
+
+    def _write_sorted_runs(self, name_col):
+        """
+        Splits the partial file into sorted, deduplicated run files of SINK_SORT_CHUNK_ROWS rows,
+        each row prefixed with the canonical key of its part_name (column name_col of the run row).
+        """
+        runs = []
+        with open(self.partial_path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            while True:
+                chunk = list(itertools.islice(reader, SINK_SORT_CHUNK_ROWS))
+                if not chunk:
+                    break
+                names = canonical_keys([row[name_col - 1] for row in chunk]) if name_col else [""] * len(chunk)
+                rows = sorted(([name_key, *row] for name_key, row in zip(names, chunk)),
+                              key=lambda row: _sort_key(row, name_col))
+                unique = {}
+                for row in rows:
+                    unique.setdefault(_dedup_key(row, name_col), row)  # First = smallest spelling, as in the merge
+                run = self.partial_path.with_name(f"{self.partial_path.name}.run{len(runs)}")
+                with open(run, "w", newline="", encoding="utf-8") as out:
+                    csv.writer(out).writerows(unique.values())
+                runs.append(run)
+        return runs
+
+def _dedup_key(row, name_col):
+    """Run row without its display part_name: canonical name key, part_id and every other column."""
+    return tuple(row[:name_col] + row[name_col + 1:]) if name_col else tuple(row)
+
+def _sort_key(row, name_col):
+    """Canonical name key first, then the rest of the row; the display name last (which spelling is kept)."""
+    return (_dedup_key(row, name_col), row[name_col] if name_col else "")
+
 # ----------------------------------------------------------------------
 # SAVE TO CSV WITH UTF-8 BOM
 # ----------------------------------------------------------------------
 def save_to_csv(data: list[dict], prefix: str, output_dir: str = "output"):
+    """Saves a complete list of rows in one go (same dedup/sort/BOM as CsvSink)."""
     if not data:
         logging.warning("No data to save.")
         return None
-    df = pd.DataFrame(data)
-    df = df.drop_duplicates().sort_values("part_name")
-    today = datetime.now().strftime("%Y-%m-%d")
-    filename = f"{prefix}_{today}.csv"
-    filepath = Path(output_dir) / filename
-    os.makedirs(output_dir, exist_ok=True)
-    df.to_csv(filepath, index=False, encoding='utf-8-sig')
-    logging.info(f"Saved {len(df)} rows to {filepath} with UTF-8 BOM")
-    return filepath
+    sink = CsvSink(prefix, output_dir)
+    sink.write(data)
+    return sink.finalize()
+
+# ----------------------------------------------------------------------
+# CONTENT-ADDRESSED BACKUPS (hardlinked snapshots, optional compression, retention)
+# ----------------------------------------------------------------------
+# backups/objects/ab/abcdef....csv[.gz|.zst]   one file per distinct content (SHA-256, see below)
+# backups/isaco_2025-11-09_backup.csv[.gz]     snapshot = hardlink to its object
+# Per-run columns (scrape_date) are blanked in the object — the date is in the snapshot's name — so a
+# catalog that did not change since yesterday addresses yesterday's object: one read (for the hash)
+# and a link, no write. restore_backup() fills the column back in.
+# Objects no snapshot links to any more (link count 1) are removed by the retention pass.
+BACKUP_SUFFIX = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+BACKUP_RUN_COLUMNS = ("scrape_date",)
+SNAPSHOT_RE = re.compile(r"^(?P<prefix>.+)_(?P<date>\d{4}-\d{2}-\d{2})_backup\.csv(\.gz|\.zst)?$")
+
+def _backup_rows(csv_path):
+    """Header + rows of a daily CSV with the per-run columns blanked (what a backup object stores)."""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        blank = [i for i, col in enumerate(header) if col in BACKUP_RUN_COLUMNS]
+        yield header
+        for row in reader:
+            for i in blank:
+                if i < len(row):
+                    row[i] = ""
+            yield row
+
+class _HashWriter:
+    """File-like target for csv.writer that only feeds a hash."""
+
+    def __init__(self, digest):
+        self.digest = digest
+
+    def write(self, text):
+        self.digest.update(text.encode("utf-8"))
+
+def _content_sha256(csv_path) -> str:
+    digest = hashlib.sha256()
+    csv.writer(_HashWriter(digest)).writerows(_backup_rows(csv_path))
+    return digest.hexdigest()
+
+def _backup_compression() -> str:
+    compression = BACKUP_COMPRESSION if BACKUP_COMPRESSION in BACKUP_SUFFIX else "none"
+    if compression == "zstd" and zstandard is None:
+        logging.warning("BACKUP_COMPRESSION = 'zstd' needs the zstandard package — using gzip")
+        return "gzip"
+    return compression
+
+def _open_object(path, mode, compression):
+    """Opens a backup object as text ('r' / 'w'), (de)compressing as its suffix says."""
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8-sig", newline="")
+    if compression == "zstd":
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor().stream_writer(raw)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    return open(path, mode, encoding="utf-8-sig", newline="")
+
+def _write_object(src, dest, compression):
+    """Writes the object of the CSV src to dest (compressed as configured) via a temp file + atomic rename."""
+    tmp = dest.with_name(dest.name + ".tmp")
+    try:
+        with _open_object(tmp, "w", compression) as f_out:
+            csv.writer(f_out).writerows(_backup_rows(src))
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def backup_file(csv_path, backup_dir: str = BACKUP_DIR):
+    """
+    Backs up a finalized daily CSV as backups/<name>_backup.csv[.gz|.zst].
+    The content (per-run columns blanked) is stored once under backups/objects/ (keyed by its SHA-256)
+    and the snapshot is a hardlink to it, so unchanged content is never written twice. Falls back to a
+    copy where hardlinks are not supported. Applies the retention rules afterwards.
+    :return: Path of the snapshot
+    """
+    csv_path = Path(csv_path)
+    backup_dir = Path(backup_dir)
+    compression = _backup_compression()
+    suffix = BACKUP_SUFFIX[compression]
+
+    digest = _content_sha256(csv_path)
+    obj = backup_dir / "objects" / digest[:2] / f"{digest}.csv{suffix}"
+    obj.parent.mkdir(parents=True, exist_ok=True)
+    if not obj.exists():
+        _write_object(csv_path, obj, compression)
+
+    snapshot = backup_dir / f"{csv_path.stem}_backup.csv{suffix}"
+    if not (snapshot.exists() and os.path.samefile(snapshot, obj)):
+        tmp = snapshot.with_name(snapshot.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(obj, tmp)
+        except OSError:  # No hardlinks here (e.g. FAT / some network drives) — plain copy
+            shutil.copyfile(obj, tmp)
+        os.replace(tmp, snapshot)
+
+    prune_backups(backup_dir)
+    return snapshot
+
+def restore_backup(snapshot, dest):
+    """
+    Writes a snapshot back as a plain daily CSV (decompressed, per-run columns filled from the snapshot's date).
+    :param snapshot: Path of backups/<site>_<date>_backup.csv[.gz|.zst]
+    :param dest: Path of the CSV to write
+    :return: dest
+    """
+    snapshot = Path(snapshot)
+    match = SNAPSHOT_RE.match(snapshot.name)
+    if not match:
+        raise ValueError(f"Not a backup snapshot: {snapshot}")
+    compression = {suffix: name for name, suffix in BACKUP_SUFFIX.items()}[match.group(3) or ""]
+    with _open_object(snapshot, "r", compression) as f_in, \
+            open(dest, "w", newline="", encoding="utf-8-sig") as f_out:
+        reader = csv.reader(f_in)
+        writer = csv.writer(f_out)
+        header = next(reader, [])
+        fill = [i for i, col in enumerate(header) if col in BACKUP_RUN_COLUMNS]
+        writer.writerow(header)
+        for row in reader:
+            for i in fill:
+                if i < len(row):
+                    row[i] = match["date"]
+            writer.writerow(row)
+    return dest
+
+def prune_backups(backup_dir: str = BACKUP_DIR):
+    """
+    Retention: per site, keeps the newest BACKUP_KEEP_LAST snapshots plus every snapshot younger than
+    BACKUP_KEEP_DAYS days; then removes objects that no snapshot links to any more.
+    """
+    backup_dir = Path(backup_dir)
+    cutoff = (datetime.now() - timedelta(days=BACKUP_KEEP_DAYS)).strftime("%Y-%m-%d")
+    snapshots = {}
+    for path in backup_dir.glob("*_backup.csv*"):
+        match = SNAPSHOT_RE.match(path.name)
+        if match:
+            snapshots.setdefault(match["prefix"], []).append((match["date"], path))
+    for entries in snapshots.values():
+        entries.sort(reverse=True)
+        for date, path in entries[BACKUP_KEEP_LAST:]:
+            if date < cutoff:
+                path.unlink(missing_ok=True)
+                logging.info(f"Backup retention: removed {path.name}")
+
+    for obj in (backup_dir / "objects").glob("*/*.csv*"):
+        if obj.stat().st_nlink == 1 and not obj.name.endswith(".tmp"):
+            obj.unlink(missing_ok=True)
+
+# ----------------------------------------------------------------------
+# FIND RECORDS IN A JSON PAYLOAD
+# ----------------------------------------------------------------------
+def extract_json_records(payload, field_map, required=("part_name", "price")):
+    """
+    Walks a JSON payload (dicts/lists, any depth) and returns every object that has the fields we need.
+    :param payload: Parsed JSON
+    :param field_map: Our column → list of candidate JSON keys, e.g. {"part_name": ["name", "title"]}
+    :param required: Columns an object must have to count as a record
+    :return: List of dicts with our column names (matched objects are not searched further)
+    """
+    records = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            record = {}
+            for column, keys in field_map.items():
+                for key in keys:
+                    value = node.get(key)
+                    if value not in (None, "", [], {}) and not isinstance(value, (dict, list)):
+                        record[column] = str(value).strip()
+                        break
+            if all(record.get(col) for col in required):
+                records.append(record)
+            else:
+                stack.extend(reversed(list(node.values())))
+    return records
+
+# ----------------------------------------------------------------------
+# BULK DOM EXTRACTION (one page.evaluate call for all records)
+# ----------------------------------------------------------------------
+EXTRACT_RECORDS_JS = """
+([container, fields]) => {
+    const read = (root, spec) => {
+        const [selector, attr] = spec.split('@');
+        const el = selector ? root.querySelector(selector) : root;
+        if (!el) return null;
+        if (attr) return el.getAttribute(attr);
+        return (el.innerText || el.textContent || '').trim();
+    };
+    const names = Object.keys(fields);
+    if (container) {
+        return Array.from(document.querySelectorAll(container)).map(node => {
+            const record = {};
+            for (const name of names) record[name] = read(node, fields[name]);
+            return record;
+        });
+    }
+    if (!names.length) return [];
+    const columns = names.map(name => {
+        const [selector, attr] = fields[name].split('@');
+        return Array.from(document.querySelectorAll(selector)).map(el => read(el, attr ? '@' + attr : ''));
+    });
+    const count = Math.min(...columns.map(c => c.length));
+    const records = [];
+    for (let i = 0; i < count; i++) {
+        const record = {};
+        names.forEach((name, j) => { record[name] = columns[j][i]; });
+        records.push(record);
+    }
+    return records;
+}
+"""
+
+async def extract_records(page, fields, container=None):
+    """
+    Extracts all records in ONE page.evaluate call instead of one inner_text() round-trip per element.
+    :param page: Playwright page object
+    :param fields: Dict name → CSS selector. 'sel@attr' reads an attribute instead of the text,
+                   '' (or '@attr') means the container element itself.
+    :param container: Selector of one record; fields are looked up inside each match.
+                      None = every field selector is queried on the whole page and the lists are
+                      paired by index (like zip() over query_selector_all results).
+    :return: List of dicts (None for a field whose element is missing)
+    """
+    return await page.evaluate(EXTRACT_RECORDS_JS, [container, fields])
+
+# ----------------------------------------------------------------------
+# INFINITE SCROLL: WAIT FOR NEW ITEMS, NOT FOR A FIXED SLEEP
+# ----------------------------------------------------------------------
+# Scrolls to the bottom, then resolves as soon as a MutationObserver sees the item count
+# grow past `known` — or after timeoutMs with the current count.
+SCROLL_AND_WAIT_JS = """
+([selector, known, timeoutMs]) => new Promise(resolve => {
+    window.scrollTo(0, document.body.scrollHeight);
+    const count = () => document.querySelectorAll(selector).length;
+    let current = count();
+    if (current > known) return resolve(current);
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        current = count();
+        if (current > known) {
+            observer.disconnect();
+            clearTimeout(timer);
+            resolve(current);
+        }
+    });
+    observer.observe(document.body, {childList: true, subtree: true});
+    timer = setTimeout(() => { observer.disconnect(); resolve(current); }, timeoutMs);
+})
+"""
+
+class _ScrollIdle:
+    """
+    Decides when an infinite scroll is done, in wall-clock time since the list last grew:
+    - nothing new for SCROLL_QUIET seconds while no XHR / fetch request was in flight — the scroll did not
+      make the page ask for another batch (a fully loaded page is done after about SCROLL_QUIET seconds);
+    - as a safety net, nothing new for SCROLL_IDLE_LIMIT seconds even though requests are still pending.
+    wait is the next MutationObserver timeout: it backs off from SCROLL_MIN_WAIT to SCROLL_WAIT_TIME,
+    but never past the moment the quiet check can end the scroll.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.loop = asyncio.get_running_loop()
+        self.pending = set()  # In-flight XHR / fetch requests
+        self.last_growth = self.last_activity = self.loop.time()
+        self.wait = SCROLL_MIN_WAIT
+        page.on("request", self._started)
+        page.on("requestfinished", self._ended)
+        page.on("requestfailed", self._ended)
+
+    def _started(self, request):
+        if request.resource_type in ("xhr", "fetch"):
+            self.pending.add(request)
+            self.last_activity = self.loop.time()
+
+    def _ended(self, request):
+        if request in self.pending:
+            self.pending.discard(request)
+            self.last_activity = self.loop.time()
+
+    def grew(self):
+        """The item count went up."""
+        self.last_growth = self.loop.time()
+        self.wait = SCROLL_MIN_WAIT
+
+    def done(self) -> bool:
+        """Called after a wait without new items: True once scrolling should stop."""
+        now = self.loop.time()
+        if now - self.last_growth >= SCROLL_IDLE_LIMIT:
+            return True
+        quiet = 0.0 if self.pending else now - max(self.last_activity, self.last_growth)
+        if quiet >= SCROLL_QUIET:
+            return True
+        self.wait = min(self.wait * 2, SCROLL_WAIT_TIME)
+        if not self.pending:
+            self.wait = min(self.wait, max(SCROLL_MIN_WAIT, SCROLL_QUIET - quiet))
+        return False
+
+    def stop(self):
+        self.page.remove_listener("request", self._started)
+        self.page.remove_listener("requestfinished", self._ended)
+        self.page.remove_listener("requestfailed", self._ended)
+
+async def scroll_until_loaded(page, item_selector):
+    """
+    Scrolls until no new items (item_selector matches) appear any more.
+    Returns right after each batch arrives instead of sleeping a fixed time, and stops as soon as a
+    scroll no longer makes the page request anything (see _ScrollIdle) — SCROLL_QUIET seconds on a page
+    that is already complete, at most SCROLL_IDLE_LIMIT while a slow batch is still loading.
+    :param page: Playwright page object
+    :param item_selector: CSS selector of one lazily loaded item
+    :return: (number of items on the page, False if SCROLL_MAX_TIME cut scrolling short)
+    """
+    logger = logging.getLogger(__name__)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SCROLL_MAX_TIME
+    idle = _ScrollIdle(page)
+    known = 0
+    try:
+        while True:
+            if loop.time() > deadline:
+                logger.warning(f"Scrolling stopped after {SCROLL_MAX_TIME}s ceiling ({known} items)")
+                return known, False
+            current = await page.evaluate(SCROLL_AND_WAIT_JS, [item_selector, known, int(idle.wait * 1000)])
+            if current > known:
+                logger.info(f"Scrolling... {current} items")
+                known = current
+                idle.grew()
+            elif idle.done():
+                break
+    finally:
+        idle.stop()
+    logger.info(f"Scrolling complete: {known} items")
+    return known, True
+
+# ----------------------------------------------------------------------
+# STREAMING SCROLL: EXTRACT EACH NEW BATCH, THEN PRUNE IT FROM THE DOM
+# ----------------------------------------------------------------------
+# Reads every item (keySelector = one element per item, e.g. its name) not read yet, marks it and,
+# with prune = 'spacer' / 'remove', replaces its item node by an empty box of the same size / removes it.
+# The item node is the largest ancestor of the key element holding no other item — found once, then
+# reused as a fixed depth (window.__scrapeItemDepth). All sizes are read before any node is replaced.
+EXTRACT_NEW_ITEMS_JS = """
+([keySelector, fields, prune]) => {
+    const read = (root, spec) => {
+        const [selector, attr] = spec.split('@');
+        const el = !selector || root.matches(selector) ? root : root.querySelector(selector);
+        if (!el) return null;
+        if (attr) return el.getAttribute(attr);
+        return (el.innerText || el.textContent || '').trim();
+    };
+    const climb = el => {
+        let node = el, depth = 0;
+        while (node.parentElement && node.parentElement !== document.body &&
+               node.parentElement.querySelectorAll(keySelector).length === 1) {
+            node = node.parentElement;
+            depth++;
+        }
+        return [node, depth];
+    };
+    const fresh = Array.from(document.querySelectorAll(keySelector + ':not([data-scraped])'));
+    if (window.__scrapeItemDepth === undefined && fresh.length && document.querySelectorAll(keySelector).length > 1) {
+        window.__scrapeItemDepth = climb(fresh[0])[1];
+    }
+    const depth = window.__scrapeItemDepth;
+    const itemOf = el => {
+        if (depth === undefined) return climb(el)[0];  // A lone item: no sibling to measure against yet
+        let node = el;
+        for (let i = 0; i < depth && node.parentElement; i++) node = node.parentElement;
+        return node;
+    };
+    const names = Object.keys(fields);
+    const items = fresh.map(el => {
+        el.setAttribute('data-scraped', '1');
+        const item = itemOf(el);
+        const record = {};
+        for (const name of names) record[name] = read(item, fields[name]);
+        return [item, record];
+    });
+    if (prune !== 'off' && depth !== undefined) {
+        const sizes = items.map(([item]) => item.getBoundingClientRect());
+        items.forEach(([item], i) => {
+            if (prune === 'remove') return item.remove();
+            const spacer = document.createElement('div');
+            spacer.setAttribute('data-scraped', '1');
+            spacer.style.cssText = `width:${sizes[i].width}px;height:${sizes[i].height}px;flex:none`;
+            item.replaceWith(spacer);
+        });
+    }
+    return items.map(([, record]) => record);
+}
+"""
+
+async def scroll_and_stream(page, key_selector, fields, on_batch, prune=SCROLL_PRUNE):
+    """
+    Like scroll_until_loaded(), but hands every newly loaded batch of items to on_batch right away and
+    (prune='spacer' / 'remove') takes the processed items out of the DOM, so the page stays small:
+    memory stays flat and each scroll costs about the same however long the catalog is.
+    :param page: Playwright page object
+    :param key_selector: CSS selector of one element per item (e.g. its name)
+    :param fields: Dict name → CSS selector inside the item (same format as extract_records)
+    :param on_batch: Called with each batch (list of dicts) as soon as it is read
+    :param prune: 'spacer' (keep layout with empty boxes), 'remove' or 'off'
+    :return: (number of items read, False if SCROLL_MAX_TIME cut scrolling short)
+    """
+    logger = logging.getLogger(__name__)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SCROLL_MAX_TIME
+    fresh_selector = f"{key_selector}:not([data-scraped])"
+    idle = _ScrollIdle(page)
+    total = 0
+    try:
+        while True:
+            batch = await page.evaluate(EXTRACT_NEW_ITEMS_JS, [key_selector, fields, prune])
+            if batch:
+                on_batch(batch)
+                total += len(batch)
+                idle.grew()
+                logger.info(f"Scrolling... {total} items streamed")
+            if loop.time() > deadline:
+                logger.warning(f"Scrolling stopped after {SCROLL_MAX_TIME}s ceiling ({total} items)")
+                return total, False
+            # Scroll and wait for unread items (the read ones are marked or gone)
+            if not await page.evaluate(SCROLL_AND_WAIT_JS, [fresh_selector, 0, int(idle.wait * 1000)]):
+                if idle.done():
+                    break
+    finally:
+        idle.stop()
+    logger.info(f"Scrolling complete: {total} items streamed")
+    return total, True
+
+# ----------------------------------------------------------------------
+# CAPTURE XHR/FETCH JSON RESPONSES (instead of scraping the DOM)
+# ----------------------------------------------------------------------
+class ResponseCapture:
+    """
+    Subscribes to page.on("response") and keeps the parsed JSON of every XHR/fetch response whose URL
+    matches one of url_patterns (all JSON XHR/fetch responses if no patterns are given).
+    Records are then pulled out of the payloads with extract_json_records().
+    Usage:
+        capture = ResponseCapture(page, [r"/api/"])   # attach BEFORE goto / click
+        ...
+        records = await capture.records(JSON_FIELDS)
+        capture.stop()
+    """
+
+    def __init__(self, page, url_patterns=None):
+        self.page = page
+        self.patterns = [re.compile(p) for p in (url_patterns or [])]
+        self.payloads = []  # (response URL, parsed JSON)
+        self._pending = set()  # body reads still in flight
+        page.on("response", self._on_response)
+
+    def _wanted(self, response):
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return False
+        if "json" not in (response.headers.get("content-type") or ""):
+            return False
+        return not self.patterns or any(p.search(response.url) for p in self.patterns)
+
+    def _on_response(self, response):
+        if self._wanted(response):
+            task = asyncio.ensure_future(self._read(response))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _read(self, response):
+        try:
+            self.payloads.append((response.url, await response.json()))
+        except Exception as e:  # Body gone (page navigated) or not valid JSON
+            logging.getLogger(__name__).debug(f"Skipped response {response.url}: {e}")
+
+    async def records(self, field_map, required=("part_name", "price"), clear=True):
+        """
+        Waits for pending body reads and returns the records found in all captured payloads.
+        :param field_map: Our column → candidate JSON keys (see extract_json_records)
+        :param required: Columns a record must have
+        :param clear: Forget the payloads afterwards (so a reused tab starts empty)
+        """
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+        found = []
+        for _, payload in self.payloads:
+            found.extend(extract_json_records(payload, field_map, required))
+        if clear:
+            self.payloads = []
+        return found
+
+    def stop(self):
+        """Unsubscribes from the page."""
+        self.page.remove_listener("response", self._on_response)
 
 # ----------------------------------------------------------------------
 # GET TODAY'S DATE
@@ -54,119 +754,250 @@ def save_to_csv(data: list[dict], prefix: str, output_dir: str = "output"):
 def get_current_date_str() -> str:
     return datetime.now().strftime("%Y-%m-%d")
 
+# ----------------------------------------------------------------------
+# GLOBAL CONCURRENCY CAPS (shared by all scrapers in the process)
+# ----------------------------------------------------------------------
+_browser_slots = None
+_page_slots = None
+
+def _get_slots():
+    # Created lazily so the semaphores belong to the running event loop
+    global _browser_slots, _page_slots
+    if _browser_slots is None:
+        _browser_slots = asyncio.Semaphore(max(1, MAX_CONCURRENT_BROWSERS))
+        _page_slots = asyncio.Semaphore(max(1, MAX_CONCURRENT_PAGES))
+    return _browser_slots, _page_slots
+
+@asynccontextmanager
+async def browser_slot():
+    """
+    Holds one of the MAX_CONCURRENT_BROWSERS slots while a site scraper (and its browser) runs.
+    """
+    browser_slots, _ = _get_slots()
+    async with browser_slots:
+        yield
+
+@asynccontextmanager
+async def page_slot():
+    """
+    Holds one of the MAX_CONCURRENT_PAGES slots while a page is loaded and scraped.
+    Scrapers wrap each unit of page work in this so parallel sites don't multiply the load.
+    """
+    _, page_slots = _get_slots()
+    async with page_slots:
+        yield
+
+async def gather_or_cancel(*aws):
+    """
+    Like asyncio.gather(), but once one awaitable fails the others are cancelled and awaited before the
+    error is raised — nothing keeps writing to a sink / checkpoint the caller has already given up on.
+    (asyncio.TaskGroup does the same from Python 3.11, but wraps the error in an ExceptionGroup.)
+    :return: List of results (in order)
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()  # No-op for finished tasks
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 # ----------------------------------------------------------------------
 # MANUAL STEALTH BROWSER LAUNCH (NO playwright-stealth)
 # ----------------------------------------------------------------------
-async def launch_browser_with_fallback(p, start_url):
+# Real Iranian mobile UA
+IRANIAN_UA = (
+    "Mozilla/5.0 (Linux; Android 13; SM-G991B) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/112.0.0.0 Mobile Safari/537.36"
+)
+
+async def launch_stealth_browser(p, browser_type):
+    """
+    Launches one browser engine with the manual stealth flags.
+    :param p: Started Playwright object
+    :param browser_type: 'chromium' or 'firefox'
+    """
+    return await p[browser_type].launch(
+        headless=HEADLESS,
+        args=[
+            "--no-sandbox",
+            "--disable-setuid-sandbox",
+            "--disable-blink-features=AutomationControlled",
+            "--disable-infobars",
+            "--disable-extensions",
+            "--disable-plugins",
+            "--disable-dev-shm-usage",
+            "--start-maximized",
+            "--disable-web-security",
+            "--allow-running-insecure-content",
+            "--disable-features=IsolateOrigins,site-per-process"
+        ]
+    )
+
+async def new_stealth_context(browser, storage_state=None):
+    """
+    Creates a browser context with the Iranian mobile profile and the stealth init scripts.
+    :param browser: Launched Playwright browser
+    :param storage_state: Saved cookies / localStorage to start with (utils/session_state.py), or None
+    """
+    context = await browser.new_context(
+        storage_state=storage_state,
+        viewport={"width": 390, "height": 844},
+        locale="fa-IR",
+        user_agent=IRANIAN_UA,
+        java_script_enabled=True,
+        bypass_csp=True,
+        permissions=["geolocation"],
+        color_scheme="light",
+        reduced_motion="no-preference",
+    )
+
+    # === MANUAL STEALTH INJECTIONS ===
+    # Added on the context so every tab a scraper opens (e.g. worker tabs) gets them too
+
+    # 1. Remove webdriver flag
+    await context.add_init_script("""
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => false,
+        });
+    """)
+
+    # 2. Mock plugins
+    await context.add_init_script("""
+        Object.defineProperty(navigator, 'plugins', {
+            get: () => [1, 2, 3, 4, 5],
+        });
+    """)
+
+    # 3. Mock languages
+    await context.add_init_script("""
+        Object.defineProperty(navigator, 'languages', {
+            get: () => ['fa-IR', 'fa', 'en-US', 'en'],
+        });
+    """)
+
+    # 4. Mock chrome runtime
+    await context.add_init_script("""
+        window.chrome = {
+            runtime: {},
+            loadTimes: () => {},
+            csi: () => {},
+        };
+    """)
+
+    # 5. Mock permissions
+    await context.add_init_script("""
+        const originalQuery = window.navigator.permissions.query;
+        window.navigator.permissions.query = (parameters) => (
+            parameters.name === 'notifications' ?
+                Promise.resolve({ state: 'denied' }) :
+            originalQuery(parameters)
+        );
+    """)
+    return context
+
+# ----------------------------------------------------------------------
+# RESOURCE BLOCKING (images, fonts, media, third-party trackers)
+# ----------------------------------------------------------------------
+def _host_in(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+async def install_resource_blocking(context, site):
+    """
+    Aborts image/font/media requests and known third-party trackers for every page of the context.
+    Rules come from BLOCKED_RESOURCE_TYPES / BLOCKED_DOMAINS / RESOURCE_ALLOW plus RESOURCE_RULES[site].
+    Note: routing turns off Chromium's HTTP cache for the context — fine for one-shot scraping.
+    :param context: Browser context
+    :param site: Site key in RESOURCE_RULES (e.g. 'isaco')
+    """
+    if not BLOCK_RESOURCES:
+        return
+    rules = RESOURCE_RULES.get(site, {})
+    block_types = set(rules.get("block_types", BLOCKED_RESOURCE_TYPES))
+    deny = list(BLOCKED_DOMAINS) + list(rules.get("deny", []))
+    allow = list(RESOURCE_ALLOW) + list(rules.get("allow", []))
+
+    async def handle(route):
+        request = route.request
+        url = request.url
+        if any(a in url for a in allow):
+            await route.continue_()
+        elif request.resource_type in block_types or _host_in(urlsplit(url).hostname or "", deny):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handle)
+
+# ----------------------------------------------------------------------
+# THROTTLED, CHECKED NAVIGATION (every page.goto goes through the rate limiter and the block check)
+# ----------------------------------------------------------------------
+async def navigate(page, url, ready=None, wait_until="domcontentloaded", timeout=TIMEOUT, min_text=0):
+    """
+    page.goto() paced by the domain's token bucket (utils/rate_limit.py), followed by the cheap
+    challenge check (utils/challenge.py: status, headers, title, small DOM probe) and the page's
+    readiness strategy (utils/readiness.py) — done as soon as the data is there, not at networkidle.
+    The outcome is reported back to the rate limiter, so a 429 / 503 / challenge slows the domain down.
+    :param ready: ReadyStrategy to wait for after wait_until (None = wait_until only)
+    :param min_text: A body with less text than this counts as blocked (0 = no check)
+    :return: Playwright Response of the navigation (or None)
+    :raises ChallengeDetected: if an anti-bot / challenge page was served
+    """
+    limiter = get_rate_limiter()
+    await limiter.throttle(url)
+    armed = ready.arm(page) if ready else None  # Before goto: the awaited response may come during it
+    try:
+        response = await page.goto(url, wait_until=wait_until, timeout=timeout)
+        reason = await detect_challenge(page, response, min_text)
+        limiter.report(url, response.status if response else None, challenge=reason is not None)
+        if reason:
+            raise ChallengeDetected(f"{reason} at {url}")
+        if ready:
+            await ready.wait(page, armed)
+        return response
+    finally:
+        disarm(armed)
+
+async def open_and_check(page, start_url, browser_type):
+    """
+    Navigates to start_url and raises ChallengeDetected if an anti-bot / Cloudflare page is shown
+    (or the page is nearly empty).
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"Testing {start_url} with {browser_type} + MANUAL STEALTH...")
+    await navigate(page, start_url, min_text=CHALLENGE_MIN_TEXT)
+
+async def launch_browser_with_fallback(p, start_url, site=None):
     """
     Full manual stealth — bypasses Cloudflare & anti-bot on stopyadak.com
     Works on Python 3.13.7
+    Launches a dedicated browser; scrapers use the shared pool (browser_session) instead.
+    Starts from the saved session state of the site (default key: the start URL's domain), if any.
     """
     logger = logging.getLogger(__name__)
-
-    # Real Iranian mobile UA
-    IRANIAN_UA = (
-        "Mozilla/5.0 (Linux; Android 13; SM-G991B) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/112.0.0.0 Mobile Safari/537.36"
-    )
+    site = site or domain_of(start_url)
+    store = get_session_store()
 
     for browser_type in BROWSER_FALLBACK:
         logger.info(f"Trying browser: {browser_type} with MANUAL STEALTH")
         browser = None
+        state = store.load(site, browser_type)
         try:
-            browser = await p[browser_type].launch(
-                headless=HEADLESS,
-                args=[
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-blink-features=AutomationControlled",
-                    "--disable-infobars",
-                    "--disable-extensions",
-                    "--disable-plugins",
-                    "--disable-dev-shm-usage",
-                    "--start-maximized",
-                    "--disable-web-security",
-                    "--allow-running-insecure-content",
-                    "--disable-features=IsolateOrigins,site-per-process"
-                ]
-            )
-
-            context = await browser.new_context(
-                viewport={"width": 390, "height": 844},
-                locale="fa-IR",
-                user_agent=IRANIAN_UA,
-                java_script_enabled=True,
-                bypass_csp=True,
-                permissions=["geolocation"],
-                color_scheme="light",
-                reduced_motion="no-preference",
-            )
-
-            # === MANUAL STEALTH INJECTIONS ===
+            browser = await launch_stealth_browser(p, browser_type)
+            context = await new_stealth_context(browser, state)
             page = await context.new_page()
 
-            # 1. Remove webdriver flag
-            await page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => false,
-                });
-            """)
-
-            # 2. Mock plugins
-            await page.add_init_script("""
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5],
-                });
-            """)
-
-            # 3. Mock languages
-            await page.add_init_script("""
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['fa-IR', 'fa', 'en-US', 'en'],
-                });
-            """)
-
-            # 4. Mock chrome runtime
-            await page.add_init_script("""
-                window.chrome = {
-                    runtime: {},
-                    loadTimes: () => {},
-                    csi: () => {},
-                };
-            """)
-
-            # 5. Mock permissions
-            await page.add_init_script("""
-                const originalQuery = window.navigator.permissions.query;
-                window.navigator.permissions.query = (parameters) => (
-                    parameters.name === 'notifications' ?
-                        Promise.resolve({ state: 'denied' }) :
-                    originalQuery(parameters)
-                );
-            """)
-
-            # Human delay
-            import random
-            await page.wait_for_timeout(random.uniform(2000, 5000))
-
-            # Navigate
-            logger.info(f"Testing {start_url} with {browser_type} + MANUAL STEALTH...")
-            await page.goto(start_url, wait_until="domcontentloaded", timeout=TIMEOUT)
-
-            # Check for blocks
-            title = await page.title()
-            body = await page.text_content("body") or ""
-            if (CLOUDFLARE_TITLE.lower() in title.lower() or 
-                "just a moment" in title.lower() or 
-                "checking your browser" in body.lower() or
-                len(body) < 1000):
-                raise PWTimeout("Anti-bot detected")
+            # Navigate (paced by the rate limiter) and check for blocks
+            await open_and_check(page, start_url, browser_type)
+            await store.save(site, browser_type, context)
 
             logger.info(f"SUCCESS with {browser_type} + MANUAL STEALTH")
             return page, context
 
         except Exception as e:
             logger.warning(f"{browser_type} failed: {e} — switching")
+            if state:
+                store.forget(site, browser_type)  # Saved cookies did not get past the check
             if browser:
                 try:
                     await browser.close()
@@ -174,4 +1005,299 @@ async def launch_browser_with_fallback(p, start_url):
                     pass
 
     logger.error("ALL BROWSERS FAILED — Try proxy or slower rate")
-    return None, None
\ No newline at end of file
+    return None, None
+
+# ----------------------------------------------------------------------
+# SHARED BROWSER POOL (one long-lived browser per engine per process)
+# ----------------------------------------------------------------------
+def _browser_memory_mb() -> float:
+    """Total RSS in MB of all child processes (Playwright driver + browsers)."""
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+class BrowserPool:
+    """
+    Keeps one Playwright instance and one browser per engine alive for the whole process and
+    hands out fresh stealth contexts to any scraper. Launch cost is paid once per browser,
+    not once per site; navigations are paced by the per-domain rate limiter. A browser is recycled (relaunched) after it has handed
+    out POOL_MAX_CONTEXTS_PER_BROWSER contexts or when browser memory goes above POOL_MAX_MEMORY_MB.
+    Engines are raced (ENGINE_RACE): the one that usually wins for the site (per-site win statistics
+    in output/.state/engine_stats.json) starts first, the next joins after ENGINE_RACE_HEAD_START
+    seconds or as soon as it fails; the first past the block check wins, the others are cancelled.
+    Cookies / localStorage of each site and engine are persisted (utils/session_state.py) and
+    loaded into every new context, so a cleared anti-bot challenge is not served again.
+    """
+
+    def __init__(self):
+        self._playwright = None
+        self._browsers = {}  # engine → {"browser", "engine", "uses", "active", "launching" (future while launching)}
+        self._retiring = []  # entries waiting for their last context to close
+        self._stats = EngineStats()  # Per-site engine wins (persisted)
+        self._background = set()  # Releases of browsers launched for a cancelled engine
+        self._lock = asyncio.Lock()
+
+    def _engine_order(self, site):
+        return self._stats.order(site, BROWSER_FALLBACK)
+
+    async def _retire(self, engine, entry):
+        self._browsers.pop(engine, None)
+        if entry["active"] > 0:
+            self._retiring.append(entry)  # Closed once its last context is released
+        else:
+            await self._close_entry(entry)
+
+    async def _close_entry(self, entry):
+        try:
+            await entry["browser"].close()
+        except Exception:
+            pass
+
+    async def _acquire_browser(self, engine):
+        """
+        Returns (entry, fresh) — launching or recycling the engine's browser if needed.
+        The entry is reserved under the pool lock, the launch itself runs outside it: engines launch
+        in parallel (the race) and other sites' sessions are not held up. Callers that find a launch
+        in progress wait for it.
+        """
+        logger = logging.getLogger(__name__)
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            entry = self._browsers.get(engine)
+            if entry is not None and entry["launching"] is None:
+                if not entry["browser"].is_connected():
+                    await self._retire(engine, entry)
+                    entry = None
+                elif entry["uses"] >= POOL_MAX_CONTEXTS_PER_BROWSER:
+                    logger.info(f"Recycling {engine}: {entry['uses']} contexts handed out")
+                    await self._retire(engine, entry)
+                    entry = None
+                elif _browser_memory_mb() > POOL_MAX_MEMORY_MB:
+                    logger.info(f"Recycling {engine}: browser memory above {POOL_MAX_MEMORY_MB} MB")
+                    await self._retire(engine, entry)
+                    entry = None
+
+            fresh = entry is None
+            if fresh:
+                launching = asyncio.get_running_loop().create_future()
+                entry = {"browser": None, "engine": engine, "uses": 0, "active": 0, "launching": launching}
+                self._browsers[engine] = entry
+            entry["uses"] += 1
+            entry["active"] += 1
+            launching = entry["launching"]
+
+        try:
+            if fresh:
+                logger.info(f"Launching pooled browser: {engine} with MANUAL STEALTH")
+                try:
+                    entry["browser"] = await launch_stealth_browser(self._playwright, engine)
+                except BaseException as e:
+                    if isinstance(e, asyncio.CancelledError):
+                        launching.cancel()
+                    else:
+                        launching.set_exception(e)
+                        launching.exception()  # Retrieved — waiters (if any) get it re-raised
+                    raise
+                entry["launching"] = None
+                launching.set_result(None)
+            elif launching is not None:
+                await asyncio.shield(launching)
+        except BaseException:
+            async with self._lock:
+                if self._browsers.get(engine) is entry:
+                    self._browsers.pop(engine)  # Failed launch — the next caller tries again
+                entry["active"] -= 1
+            raise
+        return entry, fresh
+
+    async def _release_browser(self, entry):
+        async with self._lock:
+            entry["active"] -= 1
+            if entry in self._retiring and entry["active"] == 0:
+                self._retiring.remove(entry)
+                await self._close_entry(entry)
+
+    async def _discard(self, context, entry):
+        if context:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        if entry:
+            await self._release_browser(entry)
+
+    async def _acquire_shielded(self, engine):
+        """_acquire_browser() that a cancelled race cannot interrupt mid-launch (no orphaned browser)."""
+        acquiring = asyncio.ensure_future(self._acquire_browser(engine))
+        try:
+            entry, _ = await asyncio.shield(acquiring)
+            return entry
+        except asyncio.CancelledError:
+            # Let the launch finish in the background, then hand the browser straight back to the pool
+            def release(task):
+                if not task.cancelled() and task.exception() is None:
+                    job = asyncio.ensure_future(self._release_browser(task.result()[0]))
+                    self._background.add(job)
+                    job.add_done_callback(self._background.discard)
+            acquiring.add_done_callback(release)
+            raise
+
+    async def _try_engine(self, site, start_url, browser_type):
+        """
+        Opens a context on one engine and runs the block check.
+        The context starts from the site's saved session state for that engine, so a cleared
+        challenge is not served again; the state is saved as soon as the check passes.
+        :return: (page, context, entry) — on failure or cancellation the context is closed and the error re-raised
+        """
+        logger = logging.getLogger(__name__)
+        logger.info(f"[{site}] Trying pooled browser: {browser_type}")
+        store = get_session_store()
+        entry = None
+        context = None
+        state = store.load(site, browser_type)
+        try:
+            entry = await self._acquire_shielded(browser_type)
+            context = await new_stealth_context(entry["browser"], state)
+            await install_resource_blocking(context, site)
+            page = await context.new_page()
+
+            # Paced by the per-domain rate limiter (no fixed human delay)
+            await open_and_check(page, start_url, browser_type)
+            await store.save(site, browser_type, context)
+
+            if state:
+                logger.info(f"[{site}] SUCCESS with {browser_type} (saved session state reused)")
+            else:
+                logger.info(f"[{site}] SUCCESS with {browser_type} + MANUAL STEALTH")
+            return page, context, entry
+
+        except BaseException as e:  # Also when cancelled because another engine won
+            if isinstance(e, asyncio.CancelledError):
+                logger.info(f"[{site}] {browser_type} cancelled — another engine won")
+            else:
+                logger.warning(f"[{site}] {browser_type} failed: {e}")
+                if state:
+                    store.forget(site, browser_type)  # Saved cookies did not get past the check
+            await self._discard(context, entry)
+            raise
+
+    async def _open(self, site, start_url):
+        """
+        Races the engines (best for the site first) until one gets past the block check.
+        Without ENGINE_RACE they are tried one after the other, like before.
+        """
+        logger = logging.getLogger(__name__)
+        head_start = ENGINE_RACE_HEAD_START if ENGINE_RACE else None  # None: next engine only after a failure
+        waiting = self._engine_order(site)
+        running = {}  # task → engine
+        finished = []  # Engines that won or failed (cancelled ones are not counted)
+        winner = None
+
+        def start_next():
+            engine = waiting.pop(0)
+            running[asyncio.create_task(self._try_engine(site, start_url, engine))] = engine
+
+        start_next()
+        try:
+            while running and winner is None:
+                done, _ = await asyncio.wait(
+                    running, timeout=head_start if waiting else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:  # Head start is over — the next engine joins the race
+                    start_next()
+                    continue
+                for task in done:
+                    engine = running.pop(task)
+                    finished.append(engine)
+                    if task.exception() is not None:
+                        continue
+                    if winner is None:
+                        winner = engine, task.result()
+                    else:  # Two engines passed at the same moment — keep the first
+                        await self._discard(*task.result()[1:])
+                if winner is None and waiting and not running:
+                    start_next()
+        finally:
+            for task in running:
+                task.cancel()
+            for result in await asyncio.gather(*running, return_exceptions=True):
+                if isinstance(result, tuple):  # Passed while being cancelled
+                    await self._discard(*result[1:])
+
+        self._stats.record(site, finished, winner[0] if winner else None)
+        if winner:
+            return winner[1]
+        logger.error(f"[{site}] ALL BROWSERS FAILED — Try proxy or slower rate")
+        return None, None, None
+
+    @asynccontextmanager
+    async def session(self, site, start_url):
+        """
+        Yields (page, context) already opened on start_url, or (None, None) if every engine failed.
+        The context is closed when the block exits; the browser stays in the pool.
+        :param site: Site key (e.g. 'isaco') used to remember the winning engine
+        :param start_url: URL used for the block check
+        """
+        page, context, entry = await self._open(site, start_url)
+        try:
+            yield page, context
+        finally:
+            if context:
+                # Keep cookies refreshed during the run for the next context / run
+                await get_session_store().save(site, entry["engine"], context)
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            if entry:
+                await self._release_browser(entry)
+
+    async def close(self):
+        """Closes every pooled browser and stops Playwright."""
+        async with self._lock:
+            for entry in list(self._browsers.values()) + self._retiring:
+                await self._close_entry(entry)
+            self._browsers.clear()
+            self._retiring.clear()
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+_browser_pool = None
+
+def get_browser_pool() -> BrowserPool:
+    """Returns the process-wide browser pool (created on first use)."""
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool()
+    return _browser_pool
+
+def browser_session(site, start_url):
+    """
+    Shortcut for get_browser_pool().session(site, start_url).
+    Usage: async with browser_session("isaco", START_URL) as (page, context): ...
+    """
+    return get_browser_pool().session(site, start_url)
+
+async def close_browser_pool():
+    """Closes the shared browser pool (call once at the end of a run)."""
+    global _browser_pool
+    if _browser_pool is not None:
+        await _browser_pool.close()
+        _browser_pool = None
+
+async def run_with_browser_pool(scrape_fn):
+    """
+    Runs a single scraper and closes the browser pool afterwards (for `python scrapers/x.py` runs).
+    :param scrape_fn: Async scrape() function
+    """
+    try:
+        return await scrape_fn()
+    finally:
+        await close_browser_pool()
@@ -0,0 +1,150 @@
+# utils/http_client.py
+# ======================================================================
+# HTTP FAST PATH — PLAIN HTTP/JSON INSTEAD OF A BROWSER
+# One pooled keep-alive requests.Session per process, run in worker threads so the
+# async scrapers are not blocked. Raises HttpBlocked when the site answers with an
+# anti-bot / challenge page, so the scraper can fall back to the browser; a plain 429 / 503
+# raises requests.HTTPError, which retry_call() retries with backoff.
+# Every request is paced by the same per-domain rate limiter as the browser pages.
+# ======================================================================
+
+import re
+import json
+import asyncio
+import logging
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- SHARED UTILS ---
+from utils.helpers import IRANIAN_UA
+from utils.rate_limit import get_rate_limiter
+from utils.challenge import check_response
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import HTTP_POOL_SIZE, HTTP_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+NEXT_DATA_RE = re.compile(
+    r'<script[^>]+id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL
+)
+
+class HttpBlocked(Exception):
+    """The site answered with an anti-bot / challenge response — use the browser instead."""
+
+# ----------------------------------------------------------------------
+# SHARED SESSION (connection pooling + keep-alive)
+# ----------------------------------------------------------------------
+_session = None
+
+def get_http_session() -> requests.Session:
+    """Returns the process-wide requests.Session (created on first use)."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+        _session.headers.update({
+            "User-Agent": IRANIAN_UA,
+            "Accept-Language": "fa-IR,fa;q=0.9,en-US;q=0.8,en;q=0.7",
+            "Connection": "keep-alive",
+        })
+    return _session
+
+# ----------------------------------------------------------------------
+# BLOCK DETECTION
+# ----------------------------------------------------------------------
+def looks_blocked(response) -> bool:
+    """
+    True if the response is an anti-bot / challenge page (status, headers or the first bytes of the body),
+    judged by the same rules as the browser navigations (utils/challenge.py).
+    """
+    head = response.text[:2048]
+    title = TITLE_RE.search(head)
+    return check_response(
+        response.status_code, response.headers, title.group(1) if title else "", head
+    ) is not None
+
+# ----------------------------------------------------------------------
+# FETCH
+# ----------------------------------------------------------------------
+async def fetch(url, params=None, headers=None, report_blocks=True):
+    """
+    GET url with the shared session (in a worker thread), paced by the domain's rate limiter.
+    :param report_blocks: False = a block is not fed back to the rate limiter (probes where one is expected)
+    :return: requests.Response
+    :raises HttpBlocked: if the site answered with a block / challenge
+    :raises requests.HTTPError: for other error statuses
+    """
+    session = get_http_session()
+    limiter = get_rate_limiter()
+    await limiter.throttle(url)
+    response = await asyncio.to_thread(
+        session.get, url, params=params, headers=headers, timeout=HTTP_TIMEOUT
+    )
+    blocked = looks_blocked(response)
+    if report_blocks or not blocked:
+        limiter.report(url, response.status_code, challenge=blocked)
+    if blocked:
+        raise HttpBlocked(f"{response.status_code} from {response.url}")
+    response.raise_for_status()
+    return response
+
+async def fetch_json(url, params=None):
+    """GET url and return (parsed JSON, response)."""
+    response = await fetch(url, params=params, headers={"Accept": "application/json"})
+    return response.json(), response
+
+# ----------------------------------------------------------------------
+# HTML HELPERS (no extra parser dependency)
+# ----------------------------------------------------------------------
+def extract_next_data(html):
+    """
+    Returns the parsed __NEXT_DATA__ JSON of a Next.js page, or None if the page has none.
+    """
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+class _LinkCollector(HTMLParser):
+    def __init__(self, container_class):
+        super().__init__()
+        self.container_class = container_class
+        self.depth = 0  # >0 while inside a container element
+        self.need_link = False  # Only the first <a> of each container is taken
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self.depth:
+            if tag == "a" and self.need_link and attrs.get("href"):
+                self.links.append(attrs["href"])
+                self.need_link = False
+            if tag not in VOID_TAGS:
+                self.depth += 1
+        elif self.container_class in (attrs.get("class") or "").split():
+            self.depth = 1
+            self.need_link = True
+
+    def handle_endtag(self, tag):
+        if self.depth and tag not in VOID_TAGS:
+            self.depth -= 1
+
+def extract_links(html, container_class):
+    """
+    Returns the href of the first <a> inside each element with the given class (in page order),
+    like card.query_selector('a') does in the browser.
+    """
+    collector = _LinkCollector(container_class)
+    collector.feed(html)
+    return collector.links
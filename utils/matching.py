@@ -0,0 +1,210 @@
+# utils/matching.py
+# ======================================================================
+# CROSS-SITE PART MATCHING (Isaco vs IKCO vs Saipa)
+# Links the same part across sites so prices can be compared.
+# 1. Every part name is reduced to canonical tokens and character n-grams (utils/normalize.py).
+# 2. Blocking: an inverted index (token / n-gram → parts) proposes a few candidates per part,
+#    using only rare tokens and the part's rarest n-grams — no all-pairs O(n²) comparison.
+# 3. Scoring: IDF-weighted token overlap + n-gram Dice, model numbers must agree,
+#    bonus when an Isaco part_number shows up in the other site's name.
+# Writes output/matches/matches_<date>.csv from the latest daily CSV of each site — a plain CSV of its own
+# (not a CsvSink: no normalization / part_id pass, no Parquet, not picked up as a site by the price history).
+# Run: python -m utils.matching   (or 'm' in cli_menu.py)
+# ======================================================================
+
+import os
+import csv
+import math
+import logging
+import itertools
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# --- SHARED UTILS ---
+from utils.helpers import get_current_date_str
+from utils.normalize import canonical_text, canonical_keys
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import (
+    MATCH_SITES, MATCH_MIN_SCORE, MATCH_CANDIDATES, MATCH_MAX_POSTINGS, MATCH_NGRAM, MATCH_RARE_NGRAMS,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_WEIGHT = 0.6  # Share of the score from token overlap (rest: n-gram Dice)
+PART_NUMBER_BONUS = 0.3
+NUMBER_MISMATCH_PENALTY = 0.5  # Both names carry numbers (206, 405, ...) but none in common
+
+def ngrams(key: str, n: int = MATCH_NGRAM) -> set:
+    """Character n-grams of a compact canonical key (the whole key if it is shorter than n)."""
+    if len(key) <= n:
+        return {key} if key else set()
+    return {key[i:i + n] for i in range(len(key) - n + 1)}
+
+class SiteCatalog:
+    """One site's parts with inverted indexes over their tokens and n-grams."""
+
+    def __init__(self, site: str, parts: list[dict]):
+        self.site = site
+        self.parts = parts
+        names = [p.get("part_name") or "" for p in parts]
+        texts = canonical_text(names).tolist()
+        keys = canonical_keys(names).tolist()
+        numbers = canonical_keys([p.get("part_number") or "" for p in parts]).tolist()
+
+        self.keys = keys
+        self.part_numbers = numbers
+        self.tokens = []
+        self.grams = []
+        self.token_index = defaultdict(list)
+        self.gram_index = defaultdict(list)
+        for i, (text, key, number) in enumerate(zip(texts, keys, numbers)):
+            tokens = set(text.split())
+            if len(number) >= 4:
+                tokens.add(number)  # An Isaco part number printed in another site's name blocks straight to it
+            grams = ngrams(key)
+            self.tokens.append(tokens)
+            self.grams.append(grams)
+            for token in tokens:
+                self.token_index[token].append(i)
+            for gram in grams:
+                self.gram_index[gram].append(i)
+
+        count = len(parts)
+        self.idf = {t: math.log((count + 1) / (len(p) + 1)) + 1 for t, p in self.token_index.items()}
+        self.max_idf = math.log(count + 1) + 1
+
+    def candidates(self, tokens: set, grams: set) -> list[int]:
+        """Parts sharing a rare token or one of the query's rarest n-grams, best-overlap first."""
+        counts = Counter()
+        for token in tokens:
+            postings = self.token_index.get(token)
+            if postings and len(postings) <= MATCH_MAX_POSTINGS:
+                counts.update(dict.fromkeys(postings, 2))
+        known = [g for g in grams if g in self.gram_index]
+        for gram in sorted(known, key=lambda g: len(self.gram_index[g]))[:MATCH_RARE_NGRAMS]:
+            postings = self.gram_index[gram]
+            if len(postings) <= MATCH_MAX_POSTINGS:
+                counts.update(postings)
+        return [i for i, _ in counts.most_common(MATCH_CANDIDATES)]
+
+    def weight(self, token: str) -> float:
+        return self.idf.get(token, self.max_idf)
+
+def score(query: SiteCatalog, i: int, target: SiteCatalog, j: int) -> float:
+    """Similarity of query part i and target part j (0..1)."""
+    tokens_a, tokens_b = query.tokens[i], target.tokens[j]
+    union = tokens_a | tokens_b
+    token_sim = (
+        sum(target.weight(t) for t in tokens_a & tokens_b) / sum(target.weight(t) for t in union)
+        if union else 0.0
+    )
+    grams_a, grams_b = query.grams[i], target.grams[j]
+    gram_sim = 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b)) if grams_a and grams_b else 0.0
+    result = TOKEN_WEIGHT * token_sim + (1 - TOKEN_WEIGHT) * gram_sim
+
+    numbers_a = {t for t in tokens_a if t.isdigit()}
+    numbers_b = {t for t in tokens_b if t.isdigit()}
+    if numbers_a and numbers_b and not numbers_a & numbers_b:
+        result *= NUMBER_MISMATCH_PENALTY
+
+    for number, key in ((query.part_numbers[i], target.keys[j]), (target.part_numbers[j], query.keys[i])):
+        if len(number) >= 4 and number in key:
+            result = min(1.0, result + PART_NUMBER_BONUS)
+    return result
+
+def best_matches(query: SiteCatalog, target: SiteCatalog) -> dict:
+    """Best target part (index, score) for every query part scoring at least MATCH_MIN_SCORE."""
+    found = {}
+    for i in range(len(query.parts)):
+        best, best_score = None, MATCH_MIN_SCORE
+        for j in target.candidates(query.tokens[i], query.grams[i]):
+            s = score(query, i, target, j)
+            if s >= best_score:
+                best, best_score = j, s
+        if best is not None:
+            found[i] = (best, best_score)
+    return found
+
+def match_sites(a: SiteCatalog, b: SiteCatalog) -> list[dict]:
+    """Proposed matches between two sites (one row per part of a), flagged 'mutual' when b agrees."""
+    forward = best_matches(a, b)
+    backward = best_matches(b, a)
+    rows = []
+    for i, (j, s) in forward.items():
+        pa, pb = a.parts[i], b.parts[j]
+        rows.append({
+            "site_a": a.site,
+            "part_id_a": pa.get("part_id", ""),
+            "part_number_a": pa.get("part_number", ""),
+            "part_name_a": pa.get("part_name", ""),
+            "price_a": pa.get("price", ""),
+            "site_b": b.site,
+            "part_id_b": pb.get("part_id", ""),
+            "part_number_b": pb.get("part_number", ""),
+            "part_name_b": pb.get("part_name", ""),
+            "price_b": pb.get("price", ""),
+            "score": f"{s:.3f}",
+            "mutual": "yes" if backward.get(j, (None,))[0] == i else "no",
+        })
+    logger.info(f"Matched {len(rows)}/{len(a.parts)} {a.site} parts to {b.site} ({len(b.parts)} parts)")
+    return rows
+
+# ----------------------------------------------------------------------
+# LATEST DAILY CSVs → MATCH REPORT
+# ----------------------------------------------------------------------
+def latest_csv(site: str, output_dir: str = "output"):
+    """Newest output/<site>_<date>.csv, or None."""
+    files = sorted(Path(output_dir).glob(f"{site}_????-??-??.csv"))
+    return files[-1] if files else None
+
+def load_parts(csv_path) -> list[dict]:
+    """Rows of a daily CSV, one per part (first row of each part_id / name)."""
+    parts, seen = [], set()
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            key = row.get("part_id") or (row.get("part_number"), row.get("part_name"), row.get("brand"))
+            if key not in seen:
+                seen.add(key)
+                parts.append(row)
+    return parts
+
+def run_matching(sites=None, output_dir: str = "output"):
+    """
+    Matches every pair of sites on their latest daily CSVs and saves output/matches/matches_<date>.csv.
+    :return: Path of the report, or None if fewer than two sites have data (or no matches)
+    """
+    catalogs = []
+    for site in sites or MATCH_SITES:
+        path = latest_csv(site, output_dir)
+        if not path:
+            logger.warning(f"Matching: no CSV for {site} — skipped")
+            continue
+        catalogs.append(SiteCatalog(site, load_parts(path)))
+    if len(catalogs) < 2:
+        logger.warning("Matching needs data from at least two sites")
+        return None
+
+    rows = []
+    for a, b in itertools.combinations(catalogs, 2):
+        rows.extend(match_sites(a, b))
+    if not rows:
+        logger.warning("Matching: no matches found")
+        return None
+    return save_report(rows, Path(output_dir) / "matches" / f"matches_{get_current_date_str()}.csv")
+
+def save_report(rows, path):
+    """Writes the match rows as they are (UTF-8 BOM for Excel), via a temp file + atomic rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved {len(rows)} matches to {path}")
+    return path
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    print(f"Saved → {run_matching()}")
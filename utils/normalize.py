@@ -0,0 +1,257 @@
+# utils/normalize.py
+# ======================================================================
+# PRICE + PERSIAN TEXT NORMALIZATION (VECTORIZED)
+# Prices: raw text from any scraper ('۱٬۲۵۰٬۰۰۰ تومان', '125000.0', '12,500,000 ریال', '1.250.000',
+# '1,200,000 - 1,500,000', '1.5 میلیون تومان', 'تماس بگیرید') → integer price in PRICE_UNIT plus a status.
+# Text: Arabic ي/ك → Persian ی/ک, ZWNJ / whitespace cleanup, and a compact canonical key
+# (letters folded, spaces / ZWNJ / punctuation removed) that identifies a part no matter how it was typed.
+# PartIndex maps (site, canonical key) → a stable integer part_id kept in SQLite.
+# Works on a whole batch at once with pandas string ops and precompiled translate tables —
+# no per-row Python loop. Used by CsvSink for every batch it writes.
+# ======================================================================
+
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import PRICE_UNIT, PRICE_SITE_UNITS, PART_INDEX_PATH
+
+# Python-backed strings: Python regex semantics (Unicode \w, lookbehind) whether or not pyarrow is installed
+STRING = pd.StringDtype("python")
+
+# Persian (۰-۹) and Arabic-Indic (٠-٩) digits → ASCII; Arabic separators → ASCII ones
+DIGITS_TABLE = str.maketrans(
+    "۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩٬٫،",
+    "01234567890123456789,.,",
+)
+
+# Unit words found in the price text (override the site's default unit)
+TOMAN_RE = r"تومان|تومن|toman|IRT"
+RIAL_RE = r"ریال|ريال|rial|IRR"
+RIALS_PER = {"rial": 1, "toman": 10}
+# Multiplier words: '1.5 میلیون تومان' = 1,500,000 Toman
+MULTIPLIERS = (
+    (r"هزار", 1_000),
+    (r"م[یي]?ل[یي]ون", 1_000_000),
+    (r"م[یي]ل[یي]ارد", 1_000_000_000),
+)
+
+# Thousands separators between digit groups: '1,250,000' / '1 250 000' / '1.250.000' / '۱۲۵٫۰۰۰'
+# (a dot before exactly three digits is grouping — rial / toman prices have no 3-digit fractions)
+THOUSANDS_RE = r"(?<=\d)[,.\s\u200c](?=\d{3}(?!\d))"
+# First number (+ its fraction digits) and an optional second one after a range marker
+NUMBER_RE = r"(?P<low>\d+)(?:\.(?P<frac>\d+))?(?:\s*(?:-|–|—|~|تا|الی)\s*(?P<high>\d+)(?:\.\d+)?)?"
+
+INT64_MAX = 2 ** 63 - 1
+
+# Values of the price_status column
+STATUS_OK = "ok"  # Plain number in the expected unit
+STATUS_CONVERTED = "converted"  # Text named the other unit — converted to PRICE_UNIT
+STATUS_RANGE = "range"  # 'low - high' — the low end is kept
+STATUS_MISSING = "missing"  # No digits at all (empty, 'تماس بگیرید', 'ناموجود', ...)
+STATUS_INVALID = "invalid"  # Zero, out of int64 range, or not a whole number ('12.5', '1.2345 هزار')
+
+def normalize_prices(values, assume_unit: str = PRICE_UNIT, target_unit: str = PRICE_UNIT) -> pd.DataFrame:
+    """
+    Normalizes a batch of raw prices.
+    :param values: Iterable of raw price values (str / int / float / None)
+    :param assume_unit: 'toman' or 'rial' — unit of values whose text names no unit (the site's unit)
+    :param target_unit: 'toman' or 'rial' — unit of the output prices
+    :return: DataFrame with 'price' (nullable Int64) and 'price_status' columns, same order as values
+    """
+    text = pd.Series(list(values), dtype=STRING).fillna("").str.translate(DIGITS_TABLE)
+
+    # Unit: named in the text, otherwise the site's default
+    unit = pd.Series(assume_unit, index=text.index, dtype=STRING)
+    unit = unit.mask(text.str.contains(TOMAN_RE, case=False, regex=True), "toman")
+    unit = unit.mask(text.str.contains(RIAL_RE, case=False, regex=True), "rial")
+
+    # Multiplier word: named in the text, otherwise 1
+    multiplier = pd.Series(1.0, index=text.index)
+    for pattern, value in MULTIPLIERS:
+        multiplier = multiplier.mask(text.str.contains(pattern, regex=True).astype(bool), float(value))
+
+    parts = text.str.replace(THOUSANDS_RE, "", regex=True).str.extract(NUMBER_RE)
+    low = pd.to_numeric(parts["low"], errors="coerce").astype("float64")  # float64: large values are checked below
+    # Fraction digits as an integer over 10^digits — exact, so '1.1 میلیون' is 1,100,000 and not 1,100,000.0000002
+    frac = parts["frac"].fillna("").str.rstrip("0")  # '125000.0' is a whole number
+    scale = (10.0 ** frac.str.len()).astype("float64")
+    frac_num = pd.to_numeric(frac, errors="coerce").astype("float64").fillna(0.0)
+    fractional = (frac_num * multiplier) % scale != 0  # Part of a unit is left over: '12.5' (a real price has none)
+    value = low * multiplier + frac_num * multiplier / scale
+    factor = unit.map(RIALS_PER).astype("float64") / RIALS_PER[target_unit]
+    amount = (value * factor).floordiv(1)
+
+    status = pd.Series(STATUS_OK, index=text.index, dtype=STRING)
+    status = status.mask(unit != target_unit, STATUS_CONVERTED)
+    status = status.mask(parts["high"].notna(), STATUS_RANGE)
+    invalid = amount.notna() & ((amount <= 0) | (amount > INT64_MAX) | fractional)
+    status = status.mask(invalid, STATUS_INVALID)
+    status = status.mask(low.isna(), STATUS_MISSING)
+
+    price = amount.mask(invalid | low.isna()).astype("Int64")
+    return pd.DataFrame({"price": price, "price_status": status})
+
+# ----------------------------------------------------------------------
+# PERSIAN TEXT
+# ----------------------------------------------------------------------
+ZWNJ = "\u200c"
+DIACRITICS = "".join(chr(c) for c in range(0x064B, 0x0653)) + "\u0670"  # Harakat, tanwin, shadda, superscript alef
+
+# Display form: same letters a Persian reader expects, Arabic look-alikes replaced
+TEXT_TABLE = str.maketrans({
+    "ي": "ی", "ى": "ی", "ك": "ک",
+    "\u0640": None,  # Tatweel (ـ)
+    "\u00a0": " ", "\u200f": None, "\u200e": None, "\ufeff": None,  # NBSP, RTL/LTR marks, BOM
+    **{ch: None for ch in DIACRITICS},
+    **{p: str(i) for i, p in enumerate("۰۱۲۳۴۵۶۷۸۹")},
+    **{a: str(i) for i, a in enumerate("٠١٢٣٤٥٦٧٨٩")},
+})
+# Canonical key: additionally fold letter variants and drop everything that is not a letter/digit
+KEY_TABLE = str.maketrans({
+    "ة": "ه", "ۀ": "ه", "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ؤ": "و", "ئ": "ی", "ء": None,
+})
+SPACES_RE = r"\s*\u200c[\s\u200c]*|[\s\u200c]*\u200c\s*"  # ZWNJ runs with stray spaces around them
+KEY_DROP_RE = r"[\W_]+"  # Spaces, ZWNJ, punctuation
+
+def normalize_text(values) -> pd.Series:
+    """
+    Display normalization for a batch: ي/ك → ی/ک, digits → ASCII, tatweel / diacritics removed,
+    ZWNJ runs collapsed to one ZWNJ, whitespace collapsed and stripped.
+    """
+    text = pd.Series(list(values), dtype=STRING).fillna("").str.translate(TEXT_TABLE)
+    text = text.str.replace(SPACES_RE, ZWNJ, regex=True).str.replace(r"\s+", " ", regex=True)
+    return text.str.strip(" " + ZWNJ)
+
+def canonical_text(values) -> pd.Series:
+    """
+    normalize_text() + lowercase + letter variants folded (ة/ۀ → ه, أ/إ/آ → ا, ...), with ZWNJ and
+    punctuation turned into single spaces — the word-level form used for token matching.
+    """
+    text = normalize_text(values).str.lower().str.translate(KEY_TABLE)
+    return text.str.replace(KEY_DROP_RE, " ", regex=True).str.strip()
+
+def canonical_keys(values) -> pd.Series:
+    """
+    Compact canonical key for a batch: canonical_text() with the spaces removed.
+    'لنت‌ترمز  جلو - پژو ۲۰۶' and 'لنت ترمز جلو پژو 206' get the same key.
+    """
+    return canonical_text(values).str.replace(" ", "", regex=False)
+
+def canonical_key(value) -> str:
+    """canonical_keys() for a single value."""
+    return canonical_keys([value]).iloc[0]
+
+KEY_COLUMNS = ("part_number", "part_name", "brand")  # Identify a part within one site
+
+def part_keys(frame: pd.DataFrame) -> pd.Series:
+    """Canonical part key per row: canonical part number | name | brand (columns a site lacks are empty)."""
+    keys = [
+        canonical_keys(frame[col]) if col in frame else pd.Series("", index=frame.index, dtype=STRING)
+        for col in KEY_COLUMNS
+    ]
+    return keys[0].str.cat(keys[1:], sep="|")
+
+# ----------------------------------------------------------------------
+# PART INDEX: (site, canonical key) → part_id
+# ----------------------------------------------------------------------
+class PartIndex:
+    """
+    Stable integer ids for parts, kept in SQLite (default: output/part_index.sqlite) and cached in memory.
+    The same part gets the same part_id every day, however its name was spelled that day.
+    """
+
+    def __init__(self, path: str = PART_INDEX_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS parts ("
+            " id INTEGER PRIMARY KEY,"
+            " site TEXT NOT NULL,"
+            " part_key TEXT NOT NULL,"
+            " part_name TEXT,"  # Display name when first seen
+            " first_seen TEXT NOT NULL,"
+            " UNIQUE (site, part_key))"
+        )
+        self.conn.commit()
+        self._ids = {}  # site → {part_key: id}, loaded on first use
+        self._lock = threading.Lock()
+
+    def _site_ids(self, site):
+        if site not in self._ids:
+            self._ids[site] = dict(self.conn.execute(
+                "SELECT part_key, id FROM parts WHERE site = ?", (site,)
+            ))
+        return self._ids[site]
+
+    def ids_for(self, site: str, keys, names=None) -> list[int]:
+        """
+        part_id for every key (new keys are added in one bulk insert).
+        :param names: Display names stored for new parts (same order as keys)
+        """
+        keys = list(keys)
+        names = list(names) if names is not None else [""] * len(keys)
+        with self._lock:
+            ids = self._site_ids(site)
+            new = {key: name for key, name in zip(keys, names) if key not in ids}
+            if new:
+                today = datetime.now().strftime("%Y-%m-%d")
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO parts (site, part_key, part_name, first_seen) VALUES (?, ?, ?, ?)",
+                    [(site, key, name, today) for key, name in new.items()],
+                )
+                self.conn.commit()
+                placeholders = ",".join("?" * len(new))
+                ids.update(self.conn.execute(
+                    f"SELECT part_key, id FROM parts WHERE site = ? AND part_key IN ({placeholders})",
+                    [site, *new],
+                ))
+            return [ids[key] for key in keys]
+
+    def lookup(self, site: str, key: str):
+        """part_id of a canonical key, or None if the part was never seen."""
+        with self._lock:
+            return self._site_ids(site).get(key)
+
+_part_index = None
+
+def get_part_index() -> PartIndex:
+    """Returns the process-wide PartIndex (created on first use)."""
+    global _part_index
+    if _part_index is None:
+        _part_index = PartIndex()
+    return _part_index
+
+# ----------------------------------------------------------------------
+# WHOLE BATCH (used by CsvSink)
+# ----------------------------------------------------------------------
+TEXT_COLUMNS = ("part_number", "part_name", "brand")
+
+def normalize_rows(rows: list[dict], site: str = None, index: PartIndex = None) -> list[dict]:
+    """
+    Normalizes a batch of rows in one vectorized pass:
+    text columns cleaned (normalize_text), 'price' parsed (+ 'price_status'), 'part_id' added.
+    :param rows: Row dicts as produced by a scraper
+    :param site: Site key — default price unit and part_id namespace
+    :param index: PartIndex for part_id (default: the process-wide one)
+    :return: New row dicts; price is a digit string ('' if it could not be parsed)
+    """
+    if not rows:
+        return rows
+    frame = pd.DataFrame(rows)
+    for col in TEXT_COLUMNS:
+        if col in frame:
+            frame[col] = normalize_text(frame[col])
+    if "price" in frame:
+        prices = normalize_prices(frame["price"], assume_unit=PRICE_SITE_UNITS.get(site, PRICE_UNIT))
+        frame["price"] = prices["price"].astype(STRING).fillna("")
+        frame["price_status"] = prices["price_status"]
+    if "part_name" in frame:
+        index = index or get_part_index()
+        frame["part_id"] = index.ids_for(site or "", part_keys(frame), frame["part_name"])
+    return frame.astype(object).where(frame.notna(), "").to_dict("records")
@@ -0,0 +1,184 @@
+# utils/page_cache.py
+# ======================================================================
+# CONDITIONAL RE-CRAWL — PER-URL PAGE CACHE
+# Remembers, for every scraped page, its validators (ETag, Last-Modified, a hash of the
+# normalized HTML) and the rows extracted from it. Next time the page is first checked with a
+# cheap conditional GET; if it is unchanged the stored rows are reused and the page is not fetched again.
+# Only for pages whose rows come from their own HTML (Isaco's Next.js page data on the HTTP fast path):
+# prices loaded by XHR after a click or on scroll can change while the HTML stays the same.
+# Pages are fully re-scraped at least every PAGE_CACHE_MAX_AGE_DAYS days.
+# ======================================================================
+
+import re
+import json
+import hashlib
+import logging
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# --- SHARED UTILS ---
+from utils.http_client import fetch, HttpBlocked
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import PAGE_CACHE, PAGE_CACHE_PATH, PAGE_CACHE_MAX_AGE_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Parts of the HTML that change on every request without the content changing
+_VOLATILE_RE = re.compile(
+    r'<script(?![^>]*application/(?:ld\+)?json)[^>]*>.*?</script>'  # Inline JS (nonces, timestamps); JSON data kept
+    r'|<style[^>]*>.*?</style>'
+    r'|<!--.*?-->'
+    r'|"buildId":"[^"]*"'  # Next.js build id
+    r'|(?:_wp)?nonce["\']?\s*[:=]\s*["\'][^"\']*["\']',  # WordPress nonces
+    re.DOTALL | re.IGNORECASE,
+)
+_SPACE_RE = re.compile(r'\s+')
+
+def body_hash(html: str) -> str:
+    """SHA-1 of the HTML with scripts, comments, nonces and whitespace differences removed."""
+    normalized = _SPACE_RE.sub(" ", _VOLATILE_RE.sub("", html or "")).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+def content_hash(rows: list[dict]) -> str:
+    """SHA-1 of the extracted rows (order and scrape_date ignored)."""
+    items = sorted(
+        json.dumps({k: v for k, v in row.items() if k != "scrape_date"}, ensure_ascii=False, sort_keys=True)
+        for row in rows
+    )
+    return hashlib.sha1("\n".join(items).encode("utf-8")).hexdigest()
+
+class PageCache:
+    """
+    SQLite cache of validators and extracted rows per URL (one file for all sites, kept between days).
+    Usage:
+        cache = PageCache()
+        rows, response = await cache.revalidate(url, today)
+        if rows is None:                          # new or changed page (response = the fresh 200, if any)
+            rows = ...                            # full scrape of the page's HTML
+            cache.store(url, rows, headers, html) # validators of that HTML response
+        cache.log_summary("isaco")
+    """
+
+    def __init__(self, path: str = PAGE_CACHE_PATH, enabled: bool = PAGE_CACHE):
+        self.enabled = enabled
+        self.reused = 0  # Pages whose stored rows were reused
+        self.scraped = 0  # Pages stored after a full scrape
+        self.changed = 0  # ... of which the extracted content differed from last time
+        self.blocked = False  # Plain HTTP is blocked — no more revalidation this run
+        if not enabled:
+            return
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body_hash TEXT,"
+            " content_hash TEXT,"
+            " rows TEXT NOT NULL,"
+            " scraped_at TEXT NOT NULL,"  # Last full scrape
+            " verified_at TEXT NOT NULL)"  # Last time the page was seen unchanged (or scraped)
+        )
+        self.conn.commit()
+
+    def _entry(self, url):
+        return self.conn.execute(
+            "SELECT etag, last_modified, body_hash, content_hash, rows, scraped_at FROM pages WHERE url = ?",
+            (url,),
+        ).fetchone()
+
+    async def revalidate(self, url, today):
+        """
+        Checks a cached page with a conditional GET.
+        :param url: Page URL
+        :param today: Date string written into the reused rows' scrape_date column
+        :return: (rows, None) if the page is unchanged,
+                 (None, response) if it changed (the fresh 200 response, reusable by HTTP scrapers),
+                 (None, None) if it is not cached, too old or could not be checked
+        """
+        if not self.enabled or self.blocked:
+            return None, None
+        entry = self._entry(url)
+        if not entry:
+            return None, None
+        etag, last_modified, old_body_hash, _, rows, scraped_at = entry
+        if datetime.now() - datetime.fromisoformat(scraped_at) > timedelta(days=PAGE_CACHE_MAX_AGE_DAYS):
+            return None, None
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            # A block here is not the site's answer to real traffic — keep it out of the rate limiter
+            response = await fetch(url, headers=headers, report_blocks=False)
+        except HttpBlocked as e:
+            logger.info(f"Revalidation blocked ({e}) — not revalidating for the rest of the run")
+            self.blocked = True
+            return None, None
+        except Exception as e:  # Network error — the page is scraped normally
+            logger.debug(f"Revalidation failed for {url}: {e}")
+            return None, None
+
+        unchanged = response.status_code == 304 or (
+            old_body_hash is not None and body_hash(response.text) == old_body_hash
+        )
+        if not unchanged:
+            return None, response
+
+        self.conn.execute(
+            "UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified),"
+            " verified_at = ? WHERE url = ?",
+            (response.headers.get("ETag"), response.headers.get("Last-Modified"), _now(), url),
+        )
+        self.conn.commit()
+        self.reused += 1
+        return [{**row, "scrape_date": today} for row in json.loads(rows)], None
+
+    def store(self, url, rows, headers=None, html=None) -> bool:
+        """
+        Saves the rows of a fully scraped page with the validators of its HTML response.
+        :param headers: Response headers of the page itself (ETag / Last-Modified)
+        :param html: Raw HTML of the page (for the body hash), None if not available
+        :return: True if the extracted content differs from the previous scrape
+        """
+        if not self.enabled:
+            return True
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        old = self._entry(url)
+        new_hash = content_hash(rows)
+        changed = not old or old[3] != new_hash
+        now = _now()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages"
+            " (url, etag, last_modified, body_hash, content_hash, rows, scraped_at, verified_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                url, headers.get("etag"), headers.get("last-modified"),
+                body_hash(html) if html is not None else None,
+                new_hash, json.dumps(rows, ensure_ascii=False), now, now,
+            ),
+        )
+        self.conn.commit()
+        self.scraped += 1
+        self.changed += changed
+        return changed
+
+    def log_summary(self, site):
+        if self.enabled:
+            logger.info(
+                f"Page cache ({site}): {self.reused} unchanged pages reused, "
+                f"{self.scraped} scraped ({self.changed} with new content)"
+            )
+
+    def close(self):
+        if self.enabled:
+            self.conn.close()
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
@@ -0,0 +1,92 @@
+# utils/parquet_sink.py
+# ======================================================================
+# PARQUET OUTPUT (TYPED, PARTITIONED) — OPTIONAL, NEEDS pyarrow
+# Converts the finalized daily CSV into Parquet with a typed schema:
+# price / part_id as int64, brand / source_url / price_status as categoricals (dictionary-encoded), text as strings.
+# Files are partitioned by site and scrape_date (Hive layout), so months of snapshots load with
+#     pandas.read_parquet("output/parquet", filters=[("site", "==", "isaco")])
+# instead of concatenating dozens of CSVs.
+# ======================================================================
+
+import os
+import csv
+import itertools
+import logging
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency — CSV output keeps working without it
+    pa = pq = None
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import PARQUET_DIR, SINK_SORT_CHUNK_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Partition columns live in the directory names, not in the files
+PARTITION_COLUMNS = ("site", "scrape_date")
+CATEGORICAL_COLUMNS = ("brand", "source_url", "price_status")
+INT_COLUMNS = ("price", "part_id")
+
+def parquet_schema(columns):
+    """Arrow schema for the CSV columns (partition columns left out)."""
+    fields = []
+    for name in columns:
+        if name in PARTITION_COLUMNS:
+            continue
+        if name in INT_COLUMNS:
+            fields.append(pa.field(name, pa.int64()))
+        elif name in CATEGORICAL_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+def _to_int(value):
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else None  # Empty / unparsable price → null
+
+def write_parquet(csv_path, site: str, scrape_date: str, output_dir: str = PARQUET_DIR):
+    """
+    Writes the daily CSV as output/parquet/site=<site>/scrape_date=<date>/part-0.parquet
+    (SINK_SORT_CHUNK_ROWS rows in memory at a time, atomic rename).
+    :return: Path of the Parquet file, or None if pyarrow is not installed
+    """
+    if pa is None:
+        logger.warning("Parquet output needs pyarrow (pip install pyarrow) — skipped")
+        return None
+
+    folder = Path(output_dir) / f"site={site}" / f"scrape_date={scrape_date}"
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / "part-0.parquet"
+    tmp_path = folder / "part-0.parquet.tmp"
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        schema = parquet_schema(columns)
+        kept = [i for i, name in enumerate(columns) if name not in PARTITION_COLUMNS]
+        try:
+            with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+                while True:
+                    chunk = list(itertools.islice(reader, SINK_SORT_CHUNK_ROWS))
+                    if not chunk:
+                        break
+                    arrays = []
+                    for i, field in zip(kept, schema):
+                        values = [row[i] if i < len(row) else "" for row in chunk]
+                        if field.name in INT_COLUMNS:
+                            arrays.append(pa.array([_to_int(v) for v in values], pa.int64()))
+                        elif field.name in CATEGORICAL_COLUMNS:
+                            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+                        else:
+                            arrays.append(pa.array(values, pa.string()))
+                    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    logger.info(f"Saved Parquet → {path}")
+    return path
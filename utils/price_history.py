@@ -0,0 +1,247 @@
+# utils/price_history.py
+# ======================================================================
+# PRICE HISTORY STORE (CHANGE-ONLY, SCD2)
+# One row per part per price: valid_from is the first scrape date the price was seen,
+# valid_to the first date it was no longer seen (NULL = current price).
+# Storage grows with the number of price changes, not catalog size × days.
+# Each finalized daily CSV is bulk-upserted through a staging table; lookups are index seeks:
+#     history.price_on("isaco", key, "2025-11-09")
+#     history.changes_since("2025-11-01")
+# Backfill from existing CSVs:  python -m utils.price_history
+# ======================================================================
+
+import csv
+import logging
+import sqlite3
+import itertools
+from pathlib import Path
+
+import pandas as pd
+
+# --- SHARED UTILS ---
+from utils.normalize import part_keys
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import PRICE_HISTORY_PATH
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    part_key TEXT NOT NULL,
+    part_number TEXT,
+    part_name TEXT,
+    brand TEXT,
+    price INTEGER NOT NULL,
+    source_url TEXT,
+    valid_from TEXT NOT NULL,
+    valid_to TEXT
+);
+-- At most one current version per part
+CREATE UNIQUE INDEX IF NOT EXISTS ix_history_current ON price_history (site, part_key) WHERE valid_to IS NULL;
+-- "price of part X on date D"
+CREATE INDEX IF NOT EXISTS ix_history_part ON price_history (part_key, valid_from);
+-- "all changes since D"
+CREATE INDEX IF NOT EXISTS ix_history_from ON price_history (valid_from);
+CREATE TABLE IF NOT EXISTS ingests (
+    site TEXT NOT NULL,
+    scrape_date TEXT NOT NULL,
+    PRIMARY KEY (site, scrape_date)
+);
+"""
+
+INGEST_CHUNK_ROWS = 10000  # Rows keyed (vectorized) and staged at a time
+
+def part_key(row: dict) -> str:
+    """
+    Identity of a part within its site: canonical part number | name | brand (utils/normalize.py),
+    so spelling variants (ي/ی, ك/ک, ZWNJ, spaces) join across days.
+    """
+    return part_keys(pd.DataFrame([row])).iloc[0]
+
+def _price(value):
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else None
+
+class PriceHistory:
+    """
+    SCD2 price history in SQLite (default: output/price_history.sqlite).
+    Usage:
+        history = PriceHistory()
+        history.ingest_csv(csv_path, "isaco", today, full_snapshot=True)
+        history.close()
+    """
+
+    def __init__(self, path: str = PRICE_HISTORY_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    # ------------------------------------------------------------------
+    # INGEST
+    # ------------------------------------------------------------------
+    def ingest(self, rows, site: str, scrape_date: str, full_snapshot: bool = True) -> dict:
+        """
+        Bulk-upserts one day's rows for a site (one transaction).
+        :param rows: Iterable of row dicts (rows without a numeric price are ignored)
+        :param site: Site key (e.g. 'isaco')
+        :param scrape_date: Date the rows were scraped (YYYY-MM-DD); days must be ingested in order
+        :param full_snapshot: True if rows are the whole catalog — parts missing from it are closed
+        :return: Counts {'new', 'changed', 'closed'} (all 0 if the day was skipped)
+        """
+        counts = {"new": 0, "changed": 0, "closed": 0}
+        latest = self.conn.execute(
+            "SELECT MAX(scrape_date) FROM ingests WHERE site = ?", (site,)
+        ).fetchone()[0]
+        if latest and scrape_date < latest:
+            logger.warning(f"Price history: {site} {scrape_date} is older than {latest} — skipped")
+            return counts
+
+        with self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS temp.staging")
+            self.conn.execute(
+                "CREATE TEMP TABLE staging ("
+                " part_key TEXT PRIMARY KEY, part_number TEXT, part_name TEXT, brand TEXT,"
+                " price INTEGER NOT NULL, source_url TEXT)"
+            )
+            rows = iter(rows)
+            while chunk := list(itertools.islice(rows, INGEST_CHUNK_ROWS)):
+                keys = part_keys(pd.DataFrame(chunk))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO temp.staging VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (key, row.get("part_number"), row.get("part_name"), row.get("brand"),
+                         price, row.get("source_url"))
+                        for key, row in zip(keys, chunk)
+                        if (price := _price(row.get("price"))) is not None
+                    ),
+                )
+            params = {"site": site, "date": scrape_date}
+
+            # Same-day re-run with a different price: correct the version opened today in place
+            self.conn.execute(
+                "UPDATE price_history SET price = (SELECT s.price FROM temp.staging s WHERE s.part_key = price_history.part_key)"
+                " WHERE site = :site AND valid_to IS NULL AND valid_from = :date"
+                " AND price IS NOT (SELECT s.price FROM temp.staging s WHERE s.part_key = price_history.part_key)"
+                " AND part_key IN (SELECT part_key FROM temp.staging)",
+                params,
+            )
+            # Price changed: close the current version ...
+            counts["changed"] = self.conn.execute(
+                "UPDATE price_history SET valid_to = :date"
+                " WHERE site = :site AND valid_to IS NULL AND valid_from < :date"
+                " AND EXISTS (SELECT 1 FROM temp.staging s"
+                "             WHERE s.part_key = price_history.part_key AND s.price != price_history.price)",
+                params,
+            ).rowcount
+            # Part gone from a full snapshot: close it too
+            if full_snapshot:
+                counts["closed"] = self.conn.execute(
+                    "UPDATE price_history SET valid_to = :date"
+                    " WHERE site = :site AND valid_to IS NULL AND valid_from < :date"
+                    " AND part_key NOT IN (SELECT part_key FROM temp.staging)",
+                    params,
+                ).rowcount
+            # ... and open a version for every part without a current one (new parts + changed prices)
+            inserted = self.conn.execute(
+                "INSERT INTO price_history"
+                " (site, part_key, part_number, part_name, brand, price, source_url, valid_from)"
+                " SELECT :site, s.part_key, s.part_number, s.part_name, s.brand, s.price, s.source_url, :date"
+                " FROM temp.staging s"
+                " WHERE NOT EXISTS (SELECT 1 FROM price_history h"
+                "                   WHERE h.site = :site AND h.part_key = s.part_key AND h.valid_to IS NULL)",
+                params,
+            ).rowcount
+            counts["new"] = inserted - counts["changed"]
+            self.conn.execute("INSERT OR IGNORE INTO ingests VALUES (?, ?)", (site, scrape_date))
+            self.conn.execute("DROP TABLE temp.staging")
+
+        logger.info(
+            f"Price history ({site} {scrape_date}): {counts['new']} new parts, "
+            f"{counts['changed']} price changes, {counts['closed']} parts gone"
+        )
+        return counts
+
+    def ingest_csv(self, csv_path, site: str, scrape_date: str, full_snapshot: bool = True) -> dict:
+        """ingest() straight from a daily CSV (streamed, never fully loaded)."""
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            return self.ingest(csv.DictReader(f), site, scrape_date, full_snapshot)
+
+    # ------------------------------------------------------------------
+    # QUERIES
+    # ------------------------------------------------------------------
+    def price_on(self, site: str, key: str, date: str):
+        """
+        Price of a part on a given date.
+        :param key: part_key() of the part
+        :return: sqlite3.Row (price, valid_from, valid_to, ...) or None if the part had no price that day
+        """
+        return self.conn.execute(
+            "SELECT * FROM price_history"
+            " WHERE part_key = ? AND site = ? AND valid_from <= ? AND (valid_to IS NULL OR valid_to > ?)",
+            (key, site, date, date),
+        ).fetchone()
+
+    def changes_since(self, date: str, site: str = None) -> list:
+        """
+        Every price version that started on or after date, with the price it replaced
+        (old_price is NULL for new parts).
+        """
+        query = (
+            "SELECT h.site, h.part_key, h.part_number, h.part_name, h.brand,"
+            " p.price AS old_price, h.price AS new_price, h.valid_from AS changed_on"
+            " FROM price_history h"
+            " LEFT JOIN price_history p"
+            "   ON p.site = h.site AND p.part_key = h.part_key AND p.valid_to = h.valid_from"
+            " WHERE h.valid_from >= ?"
+        )
+        params = [date]
+        if site:
+            query += " AND h.site = ?"
+            params.append(site)
+        return self.conn.execute(query + " ORDER BY h.valid_from, h.site, h.part_key", params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+# ----------------------------------------------------------------------
+# USED BY THE SCRAPERS
+# ----------------------------------------------------------------------
+def record_daily_csv(csv_path, site: str, scrape_date: str, full_snapshot: bool = True):
+    """Ingests a finalized daily CSV; errors are logged, never raised (the CSV is already saved)."""
+    try:
+        history = PriceHistory()
+        try:
+            history.ingest_csv(csv_path, site, scrape_date, full_snapshot)
+        finally:
+            history.close()
+    except Exception as e:
+        logger.error(f"Price history update failed for {site}: {e}")
+
+# ----------------------------------------------------------------------
+# BACKFILL FROM EXISTING DAILY CSVs
+# ----------------------------------------------------------------------
+def backfill(output_dir: str = "output"):
+    """Ingests every output/<site>_<date>.csv not ingested yet, oldest first."""
+    history = PriceHistory()
+    try:
+        done = {(r["site"], r["scrape_date"]) for r in history.conn.execute("SELECT * FROM ingests")}
+        files = []
+        for path in Path(output_dir).glob("*_????-??-??.csv"):
+            site, _, scrape_date = path.stem.rpartition("_")
+            if site == "matches":  # Match reports from before they moved to output/matches/ — not a site
+                continue
+            if (site, scrape_date) not in done:
+                files.append((scrape_date, site, path))
+        for scrape_date, site, path in sorted(files):
+            history.ingest_csv(path, site, scrape_date)
+    finally:
+        history.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    backfill()
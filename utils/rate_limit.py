@@ -0,0 +1,143 @@
+# utils/rate_limit.py
+# ======================================================================
+# PER-DOMAIN RATE LIMITER (POLITENESS SCHEDULER)
+# One token bucket per domain, shared by every page, worker and scraper in the process —
+# browser navigations and plain HTTP requests draw from the same bucket.
+# Adaptive (AIMD): a 429 / 503 / challenge page halves the domain's rate and empties its bucket;
+# every RATE_LIMIT_RECOVER_AFTER healthy responses in a row raise it again, up to the domain's max_qps.
+# Usage:
+#     limiter = get_rate_limiter()
+#     await limiter.throttle(url)     # before each request
+#     limiter.report(url, status)     # after it (or challenge=True)
+# ======================================================================
+
+import time
+import random
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import (
+    RATE_LIMITS, RATE_LIMIT_JITTER, RATE_LIMIT_MIN_QPS, RATE_LIMIT_BACKOFF, RATE_LIMIT_RECOVERY,
+    RATE_LIMIT_RECOVER_AFTER,
+)
+
+logger = logging.getLogger(__name__)
+
+# Status codes that mean "slow down"
+SLOW_DOWN_STATUS = {429, 503}
+
+def domain_of(url: str) -> str:
+    """Bucket key of a URL: its host without a leading 'www.'."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def _limits_for(domain: str) -> dict:
+    """RATE_LIMITS entry of the domain (or of a parent domain), else the 'default' one."""
+    limits = dict(RATE_LIMITS.get("default", {}))
+    parts = domain.split(".")
+    for i in range(len(parts)):
+        if ".".join(parts[i:]) in RATE_LIMITS:
+            limits.update(RATE_LIMITS[".".join(parts[i:])])
+            break
+    return limits
+
+class TokenBucket:
+    """Token bucket of one domain: `qps` tokens per second, at most `burst` saved up."""
+
+    def __init__(self, domain: str, qps: float, burst: int = 1, max_qps: float = None):
+        self.domain = domain
+        self.rate = float(qps)
+        self.max_rate = float(max_qps or qps)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.healthy = 0  # Healthy responses in a row
+        self._lock = None
+        self._loop = None
+
+    def _get_lock(self):
+        # Created per event loop (scheduler.py runs each job in its own asyncio.run)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Waits until a token is available and takes it (waiters are served in order)."""
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def slow_down(self, reason: str):
+        """Multiplicative decrease: halve the rate (RATE_LIMIT_BACKOFF) and drop the saved-up burst."""
+        self._refill()
+        old = self.rate
+        self.rate = max(RATE_LIMIT_MIN_QPS, self.rate * RATE_LIMIT_BACKOFF)
+        self.tokens = min(self.tokens, 0.0)
+        self.healthy = 0
+        logger.warning(f"Rate limit {self.domain}: {reason} — {old:.2f} → {self.rate:.2f} req/s")
+
+    def healthy_response(self):
+        """Counts a healthy response; after RATE_LIMIT_RECOVER_AFTER in a row the rate goes back up."""
+        self.healthy += 1
+        if self.healthy >= RATE_LIMIT_RECOVER_AFTER and self.rate < self.max_rate:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate * RATE_LIMIT_RECOVERY)
+            self.healthy = 0
+            logger.info(f"Rate limit {self.domain}: healthy — up to {self.rate:.2f} req/s")
+
+class RateLimiter:
+    """Token buckets by domain (created on first use from RATE_LIMITS)."""
+
+    def __init__(self):
+        self._buckets = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        domain = domain_of(url)
+        if domain not in self._buckets:
+            limits = _limits_for(domain)
+            self._buckets[domain] = TokenBucket(
+                domain, limits.get("qps", 1.0), limits.get("burst", 1), limits.get("max_qps"),
+            )
+        return self._buckets[domain]
+
+    async def throttle(self, url: str):
+        """Waits for the URL's domain bucket, plus a random 0..RATE_LIMIT_JITTER seconds."""
+        await self.bucket(url).acquire()
+        if RATE_LIMIT_JITTER > 0:
+            await asyncio.sleep(random.uniform(0, RATE_LIMIT_JITTER))
+
+    def report(self, url: str, status: int = None, challenge: bool = False):
+        """
+        Feeds a response back into the domain's rate.
+        :param status: HTTP status of the response (None if unknown)
+        :param challenge: True if an anti-bot / challenge page was served
+        """
+        bucket = self.bucket(url)
+        if challenge:
+            bucket.slow_down("challenge page")
+        elif status in SLOW_DOWN_STATUS:
+            bucket.slow_down(f"HTTP {status}")
+        elif status is not None and status < 400:
+            bucket.healthy_response()
+
+_rate_limiter = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide RateLimiter (created on first use)."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
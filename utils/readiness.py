@@ -0,0 +1,135 @@
+# utils/readiness.py
+# ======================================================================
+# PAGE READINESS STRATEGIES (instead of wait_until="networkidle")
+# networkidle waits for 500 ms of network silence — long-polling and analytics can delay that for
+# seconds. A navigation here is done at domcontentloaded plus the moment the data a scraper needs is there:
+#   SelectorReady(css)            — an element is in the DOM
+#   CountReady(css, n)            — at least n elements match
+#   ResponseReady(url_part)       — a response whose URL contains url_part has arrived (e.g. the data XHR)
+#   JsReady(expression)           — a custom JS predicate returns true
+#   AllReady(a, b, ...)           — all of them
+# Each strategy has its own timeout budget (ms). Scrapers register theirs per site and page kind:
+#     DETAIL_READY = register_readiness("isaco", "detail", SelectorReady(SHOW_PRICE_BTN, timeout=30000))
+#     await navigate(page, url, ready=DETAIL_READY)
+# READY_TIMEOUTS in config/settings.py overrides a budget by "site:kind".
+# ======================================================================
+
+import asyncio
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import READY_TIMEOUT, READY_TIMEOUTS
+
+class ReadyStrategy:
+    """Base: ready at domcontentloaded. arm() runs before page.goto(), wait() after it."""
+
+    def __init__(self, timeout: int = READY_TIMEOUT):
+        self.timeout = timeout
+
+    def arm(self, page):
+        """Starts listening before the navigation (for events that may fire during it). Returns a task or None."""
+        return None
+
+    async def wait(self, page, armed=None):
+        """Returns once the page is ready; raises PWTimeout after self.timeout ms."""
+
+    def __repr__(self):
+        return f"{type(self).__name__}(timeout={self.timeout})"
+
+class SelectorReady(ReadyStrategy):
+    """Ready when an element matching css is in the DOM (state='visible' to also wait for layout)."""
+
+    def __init__(self, css: str, timeout: int = READY_TIMEOUT, state: str = "attached"):
+        super().__init__(timeout)
+        self.css = css
+        self.state = state
+
+    async def wait(self, page, armed=None):
+        await page.wait_for_selector(self.css, state=self.state, timeout=self.timeout)
+
+class CountReady(ReadyStrategy):
+    """Ready when at least `count` elements match css (e.g. the first full batch of a listing)."""
+
+    def __init__(self, css: str, count: int, timeout: int = READY_TIMEOUT):
+        super().__init__(timeout)
+        self.css = css
+        self.count = count
+
+    async def wait(self, page, armed=None):
+        await page.wait_for_function(
+            "([css, count]) => document.querySelectorAll(css).length >= count",
+            arg=[self.css, self.count], timeout=self.timeout,
+        )
+
+class ResponseReady(ReadyStrategy):
+    """Ready when a successful response whose URL contains url_part has arrived."""
+
+    def __init__(self, url_part: str, timeout: int = READY_TIMEOUT):
+        super().__init__(timeout)
+        self.url_part = url_part
+
+    def arm(self, page):
+        return asyncio.ensure_future(page.wait_for_event(
+            "response", predicate=lambda r: self.url_part in r.url and r.ok, timeout=self.timeout,
+        ))
+
+    async def wait(self, page, armed=None):
+        await armed
+
+class JsReady(ReadyStrategy):
+    """Ready when the JS expression / function (given arg) returns a truthy value."""
+
+    def __init__(self, expression: str, arg=None, timeout: int = READY_TIMEOUT):
+        super().__init__(timeout)
+        self.expression = expression
+        self.arg = arg
+
+    async def wait(self, page, armed=None):
+        await page.wait_for_function(self.expression, arg=self.arg, timeout=self.timeout)
+
+class AllReady(ReadyStrategy):
+    """Ready when every strategy is (waited for together; each keeps its own timeout)."""
+
+    def __init__(self, *strategies):
+        super().__init__(max(s.timeout for s in strategies))
+        self.strategies = strategies
+
+    def arm(self, page):
+        return [s.arm(page) for s in self.strategies]
+
+    async def wait(self, page, armed=None):
+        armed = armed or [None] * len(self.strategies)
+        await asyncio.gather(*(s.wait(page, a) for s, a in zip(self.strategies, armed)))
+
+def disarm(armed):
+    """Cancels listeners left over from arm() (the navigation failed or the page was not ready)."""
+    for task in armed if isinstance(armed, list) else [armed]:
+        if isinstance(task, list):
+            disarm(task)
+        elif task is not None:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # Mark a timeout nobody awaited as retrieved
+
+# ----------------------------------------------------------------------
+# REGISTRY (site, page kind) → strategy
+# ----------------------------------------------------------------------
+_registry = {}
+
+def register_readiness(site: str, kind: str, strategy: ReadyStrategy) -> ReadyStrategy:
+    """
+    Registers the strategy for a site's page kind ('list', 'detail', ...); READY_TIMEOUTS['site:kind']
+    replaces its timeout budget if set.
+    :return: The strategy (for use as a module constant)
+    """
+    key = f"{site}:{kind}"
+    if key in READY_TIMEOUTS:
+        strategy.timeout = READY_TIMEOUTS[key]
+        for inner in getattr(strategy, "strategies", ()):
+            inner.timeout = READY_TIMEOUTS[key]
+    _registry[key] = strategy
+    return strategy
+
+def get_readiness(site: str, kind: str):
+    """Registered strategy of a site's page kind, or None (ready at domcontentloaded)."""
+    return _registry.get(f"{site}:{kind}")
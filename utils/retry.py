@@ -0,0 +1,181 @@
+# utils/retry.py
+# ======================================================================
+# RETRY / BACKOFF WITH A CIRCUIT BREAKER PER SITE
+# retry_call() runs an async call up to RETRY_ATTEMPTS times with exponential backoff + jitter,
+# but only for transient errors (timeouts, dropped connections, crashed tabs, 429 / 5xx, challenge pages).
+# Anything else (missing data, blocked HTTP fast path, bugs) is raised at once.
+# Every site has a circuit breaker: after RETRY_BREAKER_THRESHOLD transient failures in a row it opens
+# and calls fail fast with CircuitOpen for RETRY_BREAKER_COOLDOWN seconds — no hammering a site that is down.
+# Units that still fail go onto a RetryQueue, which the scrapers run once more at the end.
+# Usage:
+#     rows = await retry_call("isaco", scrape_detail, page, url, today, label=f"card {idx}")
+# ======================================================================
+
+import time
+import random
+import asyncio
+import logging
+
+import requests
+from playwright.async_api import Error as PWError, TimeoutError as PWTimeout
+
+# --- SHARED UTILS ---
+from utils.challenge import ChallengeDetected
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import (
+    RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_BREAKER_THRESHOLD, RETRY_BREAKER_COOLDOWN,
+)
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth another try
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Playwright error messages of transient failures (lowercase substrings)
+RETRYABLE_MESSAGES = (
+    "net::err_", "ns_error_", "ns_binding_aborted", "page crashed", "target crashed",
+    "target page, context or browser has been closed", "navigation failed because", "connection",
+)
+
+class CircuitOpen(Exception):
+    """The site failed too often in a row — calls are refused until the cooldown is over."""
+
+def is_retryable(exc: BaseException) -> bool:
+    """True if exc is a transient failure that another attempt may get past."""
+    if isinstance(exc, (PWTimeout, asyncio.TimeoutError, ConnectionError, requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, ChallengeDetected):  # Mid-run challenge: back off (the rate limiter slowed down too)
+        return True
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code in RETRY_STATUS
+    if isinstance(exc, PWError):
+        message = str(exc).lower()
+        return any(m in message for m in RETRYABLE_MESSAGES)
+    return False
+
+def backoff_delay(attempt: int) -> float:
+    """Seconds to wait after failed attempt number `attempt` (1-based): exponential, half of it random."""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+# ----------------------------------------------------------------------
+# CIRCUIT BREAKER (one per site, shared by every page / worker of that site)
+# ----------------------------------------------------------------------
+class CircuitBreaker:
+    """
+    Closed: calls go through. Open: calls raise CircuitOpen until RETRY_BREAKER_COOLDOWN has passed.
+    After the cooldown calls are let through again; one more failure reopens it, a success closes it.
+    """
+
+    def __init__(self, site: str):
+        self.site = site
+        self.failures = 0  # Transient failures in a row
+        self.opened_at = None
+
+    def remaining(self) -> float:
+        """Seconds until calls are let through again (0 if closed or cooled down)."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, RETRY_BREAKER_COOLDOWN - (time.monotonic() - self.opened_at))
+
+    def check(self):
+        """Raises CircuitOpen while the breaker is open."""
+        remaining = self.remaining()
+        if remaining > 0:
+            raise CircuitOpen(f"{self.site}: circuit open for another {remaining:.0f}s")
+
+    def success(self):
+        if self.opened_at is not None:
+            logger.info(f"[{self.site}] Circuit closed — site is answering again")
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= RETRY_BREAKER_THRESHOLD and self.remaining() == 0:
+            self.opened_at = time.monotonic()
+            logger.error(
+                f"[{self.site}] {self.failures} failures in a row — circuit open, "
+                f"pausing the site for {RETRY_BREAKER_COOLDOWN}s"
+            )
+
+    async def wait(self):
+        """Sleeps until the breaker lets calls through again."""
+        remaining = self.remaining()
+        if remaining > 0:
+            logger.info(f"[{self.site}] Waiting {remaining:.0f}s for the circuit to cool down")
+            await asyncio.sleep(remaining)
+
+_breakers = {}
+
+def get_breaker(site: str) -> CircuitBreaker:
+    """Returns the process-wide circuit breaker of a site (created on first use)."""
+    if site not in _breakers:
+        _breakers[site] = CircuitBreaker(site)
+    return _breakers[site]
+
+# ----------------------------------------------------------------------
+# RETRY
+# ----------------------------------------------------------------------
+async def retry_call(site, func, *args, attempts: int = RETRY_ATTEMPTS, label: str = None, **kwargs):
+    """
+    Awaits func(*args, **kwargs), retrying transient errors with backoff.
+    :param site: Site key — whose circuit breaker is checked and updated
+    :param attempts: Total attempts (1 = no retry)
+    :param label: What is being done, for log lines (default: the function name)
+    :return: Whatever func returns
+    :raises CircuitOpen: if the site's circuit is open when the call starts (later attempts wait for it)
+    :raises Exception: the last error, once attempts run out or the error is not retryable
+    """
+    breaker = get_breaker(site)
+    label = label or getattr(func, "__name__", "call")
+    for attempt in range(1, attempts + 1):
+        if attempt == 1:
+            breaker.check()
+        else:
+            await breaker.wait()  # Already started: sit out a cooldown (its own failures may have opened it)
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            breaker.failure()
+            if attempt == attempts:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"[{site}] {label} failed ({e}) — attempt {attempt + 1}/{attempts} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        else:
+            breaker.success()
+            return result
+
+# ----------------------------------------------------------------------
+# RETRY QUEUE (failed units are tried once more at the end of the run)
+# ----------------------------------------------------------------------
+class RetryQueue:
+    """
+    Units (card URLs, page numbers, ...) that still failed after retry_call().
+    Usage:
+        retries.add(item, error)        # during the main pass
+        await retries.wait()            # at the end: let an open circuit cool down
+        for item in retries.take(): ...
+    """
+
+    def __init__(self, site: str):
+        self.site = site
+        self._items = []
+
+    def add(self, item, error=None):
+        self._items.append(item)
+        logger.warning(f"[{self.site}] {item} failed ({error}) — queued for the retry pass")
+
+    def take(self) -> list:
+        """Returns the queued items and empties the queue."""
+        items, self._items = self._items, []
+        return items
+
+    async def wait(self):
+        await get_breaker(self.site).wait()
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,135 @@
+# utils/session_state.py
+# ======================================================================
+# PERSISTED BROWSER SESSION STATE (cookies + localStorage per site and engine)
+# After a browser gets past a site's anti-bot check, its storage_state (cf_clearance and the
+# other cookies, localStorage) is saved to output/.state/<site>_<engine>.json. Later contexts for the
+# same site and engine — in this run or the next — start with it, so the challenge is not served again.
+# A state expires with its cf_clearance cookie or after SESSION_STATE_MAX_AGE_HOURS, whichever is first;
+# a state that still gets challenged is deleted.
+# EngineStats keeps per-site win counts of the browser engines (output/.state/engine_stats.json),
+# so the browser pool starts the engine that usually gets through first.
+# ======================================================================
+
+import os
+import json
+import time
+import logging
+from pathlib import Path
+
+# --- CONFIG FROM SETTINGS ---
+from config.settings import SESSION_STATE, SESSION_STATE_DIR, SESSION_STATE_MAX_AGE_HOURS, ENGINE_STATS_PATH
+
+logger = logging.getLogger(__name__)
+
+# Cookies whose expiry ends the state (the anti-bot clearance)
+CLEARANCE_COOKIES = ("cf_clearance",)
+
+class SessionStore:
+    """
+    storage_state files by (site, engine).
+    Usage:
+        state = store.load("isaco", "chromium")            # None if missing / expired
+        context = await browser.new_context(storage_state=state)
+        await store.save("isaco", "chromium", context)     # after the block check passed
+    """
+
+    def __init__(self, directory: str = SESSION_STATE_DIR, enabled: bool = SESSION_STATE):
+        self.directory = Path(directory)
+        self.enabled = enabled
+
+    def _path(self, site, engine) -> Path:
+        return self.directory / f"{site}_{engine}.json"
+
+    def load(self, site: str, engine: str):
+        """Saved storage_state of the site for this engine, or None if there is none or it has expired."""
+        if not self.enabled:
+            return None
+        path = self._path(site, engine)
+        try:
+            saved = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"[{site}] Unreadable session state {path.name} ({e}) — ignored")
+            return None
+        if saved.get("expires_at", 0) <= time.time():
+            logger.info(f"[{site}] Session state for {engine} expired — starting fresh")
+            path.unlink(missing_ok=True)
+            return None
+        return saved.get("state")
+
+    async def save(self, site: str, engine: str, context):
+        """Saves the context's current storage_state (atomic write; errors are logged, never raised)."""
+        if not self.enabled:
+            return
+        try:
+            state = await context.storage_state()
+            now = time.time()
+            expires_at = now + SESSION_STATE_MAX_AGE_HOURS * 3600
+            for cookie in state.get("cookies", []):
+                if cookie.get("name") in CLEARANCE_COOKIES and cookie.get("expires", -1) > 0:
+                    expires_at = min(expires_at, cookie["expires"])
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(site, engine)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps({"saved_at": now, "expires_at": expires_at, "state": state}), encoding="utf-8"
+            )
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"[{site}] Could not save session state for {engine}: {e}")
+
+    def forget(self, site: str, engine: str):
+        """Deletes a state that no longer gets past the block check."""
+        self._path(site, engine).unlink(missing_ok=True)
+
+_session_store = None
+
+def get_session_store() -> SessionStore:
+    """Returns the process-wide SessionStore (created on first use)."""
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore()
+    return _session_store
+
+# ----------------------------------------------------------------------
+# ENGINE WIN STATISTICS (which browser engine gets through for which site)
+# ----------------------------------------------------------------------
+class EngineStats:
+    """
+    {site: {engine: {"wins", "tries"}}} kept in a small JSON file and rewritten after every race.
+    Engines are ranked by their smoothed win rate (wins + 1) / (tries + 2), ties in the given order.
+    """
+
+    def __init__(self, path: str = ENGINE_STATS_PATH):
+        self.path = Path(path)
+        try:
+            self.stats = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.stats = {}
+
+    def order(self, site: str, engines) -> list:
+        """engines sorted best first for the site."""
+        site_stats = self.stats.get(site, {})
+
+        def win_rate(engine):
+            s = site_stats.get(engine, {})
+            return (s.get("wins", 0) + 1) / (s.get("tries", 0) + 2)
+
+        return sorted(engines, key=win_rate, reverse=True)  # Stable: ties keep the given order
+
+    def record(self, site: str, tried, winner=None):
+        """Counts one try for every engine in tried and a win for winner (None = all failed)."""
+        site_stats = self.stats.setdefault(site, {})
+        for engine in tried:
+            s = site_stats.setdefault(engine, {"wins": 0, "tries": 0})
+            s["tries"] += 1
+            if engine == winner:
+                s["wins"] += 1
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self.stats, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save engine stats: {e}")